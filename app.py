@@ -1,10 +1,35 @@
 import streamlit as st
 import os
-import base64
-import markdown
-import json
-import tempfile
-from markdown_pdf import MarkdownPdf, Section
+import re
+import html
+import time
+import uuid
+from autosave import autosaver, latest_draft, new_owner, paper_draft, valid_owner
+from assets import asset_markdown, asset_paths, externalize_images, ingest_image
+from catalog import PaperCatalog
+from paper import Cell, cells_from_metadata, paper_metadata, load_metadata
+from profiles import DEFAULT_PROFILE, PRINT_PROFILES, print_profile
+from render import generate_md, generate_preview_html
+from storage import SaveConflict, paper_version, save_paper
+from tracing import RenderMemoryError, RenderTrace, content_stats
+from jobs import render_jobs
+
+# Number of cells given full editors at a time; the rest of the paper is listed in the outline
+CELLS_PER_PAGE = 10
+
+# Seconds between refreshes of a background PDF render's progress
+PDF_POLL_SECONDS = 1.0
+
+# Images, HTML tags and table or emphasis markup, left out of the outline's one-line cell excerpts
+OUTLINE_IMAGE_PATTERN = re.compile(r'!\[[^\]]*\]\([^)]*\)')
+OUTLINE_TAG_PATTERN = re.compile(r'<[^>]*>')
+OUTLINE_MARKUP_PATTERN = re.compile(r'\||:?-{3,}:?|[*_#`~]+')
+
+# Characters that would still be read as markdown, links, HTML or LaTeX in an excerpt
+OUTLINE_ESCAPE_PATTERN = re.compile(r'([\\\[\]()<>$&!:])')
+
+# Refreshes just the PDF progress rather than the whole page; st.fragment from Streamlit 1.37, experimental from 1.33
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
 
 # Set wide layout for better alignment
 st.set_page_config(layout="wide")
@@ -130,408 +155,170 @@ st.markdown("""
 
 st.title("Pariksha - Question Paper Drafting System for Teachers")
 
-# Simple cell class to replace notebook functionality
-class Cell:
-    def __init__(self, cell_type="textbox", code="", metadata=None):
-        self.type = cell_type
-        self.code = code
-        self.metadata = metadata or {}
 
+@st.cache_resource
+def get_paper_catalog():
+    """Open the paper catalog once per server process"""
+    return PaperCatalog()
 
-def generate_pdf_from_markdown(md_content, font_style, font_size, line_spacing, pagination):
-    """Generate PDF directly from markdown using markdown-pdf library"""
-    try:
-        import re
-        import tempfile
-        import os
-        from markdown_pdf import MarkdownPdf, Section
-
-        # Pre-process markdown to fix list formatting and centered headers
-        processed_md = md_content
-
-        # Fix centered headers - handle all div patterns more robustly
-        # First, handle the specific multiline div pattern from the current file
-        lines = processed_md.split('\n')
-        processed_lines = []
-        inside_center_div = False
-        i = 0
-
-        while i < len(lines):
-            line = lines[i]
-            line_stripped = line.strip()
-
-            # Look for opening div tag
-            if line_stripped == '<div style="text-align: center;">':
-                inside_center_div = True
-                i += 1
-                continue
-
-            # Look for closing div tag
-            elif line_stripped == '</div>' and inside_center_div:
-                inside_center_div = False
-                i += 1
-                continue
-
-            # Handle content inside center div
-            elif inside_center_div:
-                if line_stripped.startswith('#'):
-                    # This is a header - wrap it in center tags
-                    processed_lines.append(f'<center>{line_stripped}</center>')
-                elif line_stripped and not line_stripped.startswith('<') and not line_stripped.startswith('<!'):
-                    # Non-HTML, non-empty content - keep with center div
-                    processed_lines.append(f'<div style="text-align: center;">{line_stripped}</div>')
-                else:
-                    # HTML content, empty lines, or other - preserve as-is
-                    processed_lines.append(line)
-                i += 1
-                continue
-
-            # Handle content outside center divs
-            else:
-                processed_lines.append(line)
-                i += 1
-
-        processed_md = '\n'.join(processed_lines)
-
-        # Additional cleanup: handle any remaining inline div-wrapped headers
-        header_pattern = r'<div style="text-align: center;">\s*(#{1,6}[^<]*?)\s*</div>'
-        processed_md = re.sub(header_pattern, r'<center>\1</center>', processed_md, flags=re.MULTILINE | re.DOTALL)
-
-        # Convert alphabetical options to proper markdown lists
-        # Look for patterns like "a) text", "b) text", etc. and convert to proper list format
-        option_pattern = r'^([a-d])\)\s+(.+)$'
-        lines = processed_md.split('\n')
-        processed_lines = []
-        in_options = False
-
-        for i, line in enumerate(lines):
-            # Check if this line looks like an option
-            match = re.match(option_pattern, line.strip())
-            if match:
-                if not in_options:
-                    # Start of options list
-                    in_options = True
-                    processed_lines.append('')  # Add blank line before list
-                letter, text = match.groups()
-                # Convert to proper ordered list with lowercase letters
-                processed_lines.append(f'1. {text}')
-            else:
-                if in_options and line.strip() == '':
-                    # End of options list
-                    in_options = False
-                processed_lines.append(line)
-
-        processed_md = '\n'.join(processed_lines)
-
-        # Create MarkdownPdf instance with proper configuration
-        pdf = MarkdownPdf(toc_level=2)
-
-        # Configure styling - no title or author to avoid printing them
-
-        # Create custom CSS styling
-        css_content = f"""
-        @page {{
-            margin: 1in;
-            size: letter;
-        }}
-        body {{
-            font-family: "{font_style}", serif;
-            font-size: {font_size}pt;
-            line-height: {line_spacing};
-            color: #000;
-            margin: 0;
-            padding: 0;
-        }}
-        .first-cell-no-global-font {{
-            font-family: inherit !important;
-            font-size: inherit !important;
-        }}
-        h1, h2, h3, h4, h5, h6 {{
-            font-weight: bold !important;
-            color: #000 !important;
-            margin-top: 1em;
-            margin-bottom: 0.5em;
-            text-align: center !important;
-            display: block !important;
-            width: 100% !important;
-        }}
-        h1 {{
-            font-size: {font_size * 1.8}pt !important;
-            margin-top: 1.2em;
-            margin-bottom: 0.6em;
-            text-align: center !important;
-            font-weight: bold !important;
-        }}
-        h2 {{
-            font-size: {font_size * 1.5}pt !important;
-            margin-top: 1em;
-            margin-bottom: 0.5em;
-            text-align: center !important;
-            font-weight: bold !important;
-        }}
-        h3 {{
-            font-size: {font_size * 1.3}pt !important;
-            margin-top: 0.8em;
-            margin-bottom: 0.4em;
-            text-align: center !important;
-            font-weight: bold !important;
-        }}
-        h4 {{
-            font-size: {font_size * 1.2}pt !important;
-            margin-top: 0.7em;
-            margin-bottom: 0.4em;
-            text-align: center !important;
-            font-weight: bold !important;
-        }}
-        h5, h6 {{
-            font-weight: bold !important;
-            text-align: center !important;
-        }}
-        ul, ol {{
-            margin: 10px 0;
-            padding-left: 30px;
-        }}
-        li {{
-            margin-bottom: 8px;
-            display: list-item;
-            line-height: {line_spacing};
-        }}
-        ol li {{
-            list-style-type: lower-alpha;
-        }}
-        ul li {{
-            list-style-type: disc;
-        }}
-        strong, b {{
-            font-weight: bold;
-        }}
-        em, i {{
-            font-style: italic;
-        }}
-        img {{
-            max-width: 100%;
-            height: auto;
-            display: block;
-            margin: 10px auto;
-        }}
-        table {{
-            width: 100%;
-            border-collapse: collapse;
-            margin: 10px 0;
-        }}
-        th, td {{
-            border: 1px solid #000;
-            padding: 8px;
-            text-align: left;
-        }}
-        th {{
-            font-weight: bold;
-            background-color: #f5f5f5;
-        }}
-        .page-break {{
-            page-break-after: always;
-        }}
-        div[style*="text-align: center"] {{
-            text-align: center;
-        }}
-        center {{
-            text-align: center !important;
-            display: block !important;
-            width: 100% !important;
-        }}
-        center h1, center h2, center h3, center h4, center h5, center h6 {{
-            text-align: center !important;
-            font-weight: bold !important;
-        }}
-        div[style*="float: left"] {{
-            float: left;
-        }}
-        div[style*="float: right"] {{
-            float: right;
-        }}
-        div[style*="overflow: hidden"] {{
-            overflow: hidden;
-            clear: both;
-        }}
-        """
-
-        # Apply CSS styling properly
-        pdf.stylesheet = css_content
-
-        # Add the processed markdown content as a section
-        pdf.add_section(Section(processed_md, toc=False))
-
-        # Generate PDF using a temporary file
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-            pdf.save(temp_file.name)
-            temp_file.seek(0)
-            with open(temp_file.name, 'rb') as f:
-                pdf_bytes = f.read()
-
-            # Clean up the temporary file
-            os.unlink(temp_file.name)
-
-        return pdf_bytes
 
-    except Exception as e:
-        import streamlit as st
-        st.error(f"PDF generation failed: {str(e)}")
-        return None
-
-def generate_html(md_content, font_style, font_size, line_spacing, pagination):
-    """Generate HTML for preview"""
-    import re
-    import markdown
-
-    # Pre-process markdown to fix list formatting and centered headers (same as PDF)
-    processed_md = md_content
-
-    # Fix centered headers - handle all div patterns more robustly
-    lines = processed_md.split('\n')
-    processed_lines = []
-    inside_center_div = False
-    i = 0
-
-    while i < len(lines):
-        line = lines[i]
-        line_stripped = line.strip()
-
-        # Look for opening div tag
-        if line_stripped == '<div style="text-align: center;">':
-            inside_center_div = True
-            i += 1
-            continue
+@st.cache_resource
+def warm_up_renderer():
+    """Load the render engine in the background once per server process, when the launcher asks for it"""
+    render_jobs.warm_up()
+    return True
 
-        # Look for closing div tag
-        elif line_stripped == '</div>' and inside_center_div:
-            inside_center_div = False
-            i += 1
-            continue
 
-        # Handle content inside center div
-        elif inside_center_div:
-            if line_stripped.startswith('#'):
-                # This is a header - wrap it in center tags
-                processed_lines.append(f'<center>{line_stripped}</center>')
-            elif line_stripped and not line_stripped.startswith('<') and not line_stripped.startswith('<!'):
-                # Non-HTML, non-empty content - keep with center div
-                processed_lines.append(f'<div style="text-align: center;">{line_stripped}</div>')
-            else:
-                # HTML content, empty lines, or other - preserve as-is
-                processed_lines.append(line)
-            i += 1
-            continue
+def draft_owner():
+    """Return this browser tab's autosave owner, kept in the page URL so a reload finds the tab's own drafts"""
+    if hasattr(st, "query_params"):
+        owner = st.query_params.get("draft")
+        if not valid_owner(owner):
+            owner = st.query_params["draft"] = new_owner()
+        return owner
+    # Streamlit before 1.30
+    params = st.experimental_get_query_params()
+    owner = params.get("draft", [None])[0]
+    if not valid_owner(owner):
+        owner = new_owner()
+        st.experimental_set_query_params(**{**params, "draft": owner})
+    return owner
 
-        # Handle content outside center divs
-        else:
-            processed_lines.append(line)
-            i += 1
-
-    processed_md = '\n'.join(processed_lines)
-
-    # Additional cleanup: handle any remaining inline div-wrapped headers
-    header_pattern = r'<div style="text-align: center;">\s*(#{1,6}[^<]*?)\s*</div>'
-    processed_md = re.sub(header_pattern, r'<center>\1</center>', processed_md, flags=re.MULTILINE | re.DOTALL)
-
-    # Convert alphabetical options to proper markdown lists
-    option_pattern = r'^([a-d])\)\s+(.+)$'
-    lines = processed_md.split('\n')
-    processed_lines = []
-    in_options = False
-
-    for i, line in enumerate(lines):
-        # Check if this line looks like an option
-        match = re.match(option_pattern, line.strip())
-        if match:
-            if not in_options:
-                # Start of options list
-                in_options = True
-                processed_lines.append('')  # Add blank line before list
-            letter, text = match.groups()
-            # Convert to proper ordered list with lowercase letters
-            processed_lines.append(f'1. {text}')
-        else:
-            if in_options and line.strip() == '':
-                # End of options list
-                in_options = False
-            processed_lines.append(line)
-
-    processed_md = '\n'.join(processed_lines)
-
-    # Convert to HTML
-    html_body = markdown.markdown(processed_md, extensions=['extra'])
-
-    # Create CSS styling
-    css = f"""
-    body {{
-        font-family: {font_style};
-        font-size: {font_size}pt;
-        line-height: {line_spacing};
-        margin: 20px;
-    }}
-    .first-cell-no-global-font {{
-        font-family: inherit !important;
-        font-size: inherit !important;
-    }}
-    h1, h2, h3, h4, h5, h6 {{
-        font-weight: bold !important;
-        color: #000 !important;
-        margin-top: 1em;
-        margin-bottom: 0.5em;
-        text-align: center !important;
-        display: block !important;
-        width: 100% !important;
-    }}
-    h1 {{ font-size: {font_size * 1.8}pt !important; }}
-    h2 {{ font-size: {font_size * 1.5}pt !important; }}
-    h3 {{ font-size: {font_size * 1.3}pt !important; }}
-    h4 {{ font-size: {font_size * 1.2}pt !important; }}
-    img {{ max-width: 100%; height: auto; display: block; margin: 10px auto; }}
-    ul, ol {{
-        margin: 10px 0;
-        padding-left: 30px;
-    }}
-    li {{
-        margin-bottom: 8px;
-        line-height: {line_spacing};
-    }}
-    ol {{
-        list-style-type: lower-alpha;
-    }}
-    div[style*="text-align: center"] {{
-        text-align: center;
-    }}
-    center {{
-        text-align: center !important;
-        display: block !important;
-        width: 100% !important;
-    }}
-    center h1, center h2, center h3, center h4, center h5, center h6 {{
-        text-align: center !important;
-        font-weight: bold !important;
-    }}
-    div[style*="float: left"] {{
-        float: left;
-    }}
-    div[style*="float: right"] {{
-        float: right;
-    }}
-    div[style*="overflow: hidden"] {{
-        overflow: hidden;
-        clear: both;
-    }}
-    """
 
-    html = f"""
-    <html>
-    <head>
-    <meta charset="utf-8">
-    <style>{css}</style>
-    </head>
-    <body>{html_body}</body>
-    </html>
+def show_pdf_job(polling=False):
+    """Show the progress of the background PDF render, then its download button; return whether it is still running
+
+    With polling, this runs as a fragment refreshing itself; once the render ends the page is rerun once so the
+    fragment stops refreshing.
     """
-    return html
+    job = render_jobs.get(st.session_state.pdf_job) if st.session_state.pdf_job else None
+    if job is not None and job.status == "running":
+        st.progress(job.progress, text=f"Rendering PDF... {job.done_sections}/{len(job.sections)} sections")
+        if st.button("✖ Cancel", key="pdf_cancel_btn"):
+            render_jobs.cancel(job.id, owner=st.session_state.session_id)
+            st.session_state.pdf_job = None
+            st.rerun()
+        return True
+    if polling:
+        st.rerun()
+    if job is not None and job.status == "done":
+        st.download_button(
+            label="Download PDF",
+            data=job.pdf_bytes,
+            file_name=f"{st.session_state.paper_name or 'Untitled'}.pdf",
+            mime="application/pdf"
+        )
+    elif job is not None and job.status == "failed":
+        st.error(f"PDF generation failed: {job.error}")
+    return False
+
+
+def show_cell_page(page):
+    """Switch the editor to a page of cells, overriding the page picker on the next run"""
+    st.session_state.cell_page = page
+    st.session_state.pop("cell_page_select", None)
+
+
+def apply_print_profile():
+    """Set the font, size and spacing to the chosen print profile's own, which can then still be changed"""
+    profile = PRINT_PROFILES[st.session_state.print_profile]
+    st.session_state.font_style = profile.font_style
+    st.session_state.font_size = profile.font_size
+    st.session_state.line_spacing = profile.line_spacing
+
+
+def cell_outline(cell):
+    """Return a one-line summary of a cell for the outline"""
+    if cell.type == 'pagebreak':
+        return "📄 Page Break"
+    if cell.type == 'end':
+        return "🏁 End of Paper"
+    return f"**Q{cell.question_num}** [{cell.marks} marks] {cell_excerpt(cell.code)}"
+
+
+def cell_excerpt(text, length=80):
+    """Return the start of a cell's text as plain, escaped markdown, with images shown as 🖼️"""
+    text = OUTLINE_IMAGE_PATTERN.sub(" 🖼️ ", text)
+    text = html.unescape(OUTLINE_TAG_PATTERN.sub(" ", text))
+    excerpt = " ".join(OUTLINE_MARKUP_PATTERN.sub(" ", text).split())[:length]
+    return OUTLINE_ESCAPE_PATTERN.sub(r"\\\1", excerpt) or "(empty)"
+
+
+def apply_question_grid(cells, grid):
+    """Copy question numbers, marks and centering edited in the question grid back to the cells"""
+    for cell, question_num, marks, center in zip(cells, grid['Q#'], grid['Marks'], grid['Center']):
+        values = (int(question_num or 0), int(marks or 0), bool(center))
+        if values == (cell.question_num, cell.marks, cell.center):
+            continue
+        cell.question_num, cell.marks, cell.center = values
+        # Drop the old widget values so the cell's own inputs show the new ones
+        for key in (f"qnum_{cell.id}", f"marks_{cell.id}", f"center_{cell.id}"):
+            st.session_state.pop(key, None)
+    st.session_state.pop("question_grid_editor", None)
+
+
+def current_metadata():
+    """Build the metadata of the paper being edited"""
+    return paper_metadata(
+        st.session_state.cells,
+        st.session_state.font_style,
+        st.session_state.font_size,
+        st.session_state.line_spacing,
+        st.session_state.pagination,
+        st.session_state.marks_position,
+        st.session_state.print_profile
+    )
+
+
+def apply_paper(paper_name, data):
+    """Replace the paper being edited with one read from its metadata"""
+    st.session_state.font_style = data['font_style']
+    st.session_state.font_size = data['font_size']
+    st.session_state.line_spacing = data['line_spacing']
+    st.session_state.pagination = data['pagination']
+    st.session_state.marks_position = data.get('marks_position', 'Beginning')
+    st.session_state.print_profile = data.get('print_profile', DEFAULT_PROFILE)
+    st.session_state.cells = cells_from_metadata(data)
+    # Move images embedded inline by earlier versions into the asset store
+    for cell in st.session_state.cells:
+        cell.code = externalize_images(cell.code)
+    st.session_state.paper_name = paper_name
+    st.session_state.show_markdown_help = {}
+    st.session_state.autosave_snapshot = current_metadata()
+
+
+def forget_cell_widgets(cell_id):
+    """Drop the session state kept for a deleted cell's widgets"""
+    suffix = f"_{cell_id}"
+    for key in [key for key in st.session_state if key.endswith(suffix)]:
+        del st.session_state[key]
+    st.session_state.show_markdown_help.pop(cell_id, None)
+
+
+def save_current_paper(force=False):
+    """Save the paper being edited, refusing to overwrite changes saved elsewhere unless forced"""
+    paper_name = st.session_state.paper_name or "Untitled"
+    md_content = generate_md(st.session_state.cells, paper_name, st.session_state.marks_position)
+    metadata = current_metadata()
+    expected_version = None if force else st.session_state.paper_versions.get(paper_name)
+    try:
+        result, version = save_paper(paper_name, metadata, asset_paths(md_content, "../assets/"), expected_version=expected_version)
+    except SaveConflict as e:
+        st.session_state.save_conflict = f"{e}. Load it again to see those changes, or save anyway to replace them."
+        return
+    except OSError as e:
+        st.error(f"Error saving file: {e}")
+        return
+    st.session_state.save_conflict = None
+    st.session_state.paper_versions[paper_name] = version
+    st.session_state.autosave_snapshot = metadata
+    autosaver.discard(st.session_state.draft_owner, paper_name)
+    if result == "unchanged":
+        st.info("No changes to save")
+        return
+    get_paper_catalog().update(paper_name, metadata)
+    st.success(f"Saved to papers/{paper_name}.md and metadata/{paper_name}.json")
+
 
 # Initialize session state
 if 'paper_name' not in st.session_state:
@@ -546,61 +333,103 @@ if 'pagination' not in st.session_state:
     st.session_state.pagination = True
 if 'marks_position' not in st.session_state:
     st.session_state.marks_position = "Beginning"
+if 'print_profile' not in st.session_state:
+    st.session_state.print_profile = DEFAULT_PROFILE
 if 'show_markdown_help' not in st.session_state:
     st.session_state.show_markdown_help = {}
 if 'show_preview' not in st.session_state:
     st.session_state.show_preview = False
 if 'cells' not in st.session_state:
     st.session_state.cells = []
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+if 'cell_page' not in st.session_state:
+    show_cell_page(0)
+if 'pdf_job' not in st.session_state:
+    st.session_state.pdf_job = None
+# Version of each paper as last loaded or saved in this session, to detect saves from other sessions
+if 'paper_versions' not in st.session_state:
+    st.session_state.paper_versions = {}
+if 'save_conflict' not in st.session_state:
+    st.session_state.save_conflict = None
+# Last snapshot handed to the autosaver, and a draft with unsaved changes found on load
+if 'draft_owner' not in st.session_state:
+    st.session_state.draft_owner = draft_owner()
+if 'autosave_snapshot' not in st.session_state:
+    st.session_state.autosave_snapshot = None
+if 'autosave_draft' not in st.session_state:
+    # Only this tab's own drafts; another teacher's are never offered to a new session
+    own_draft = latest_draft(st.session_state.draft_owner)
+    st.session_state.autosave_draft = (st.session_state.draft_owner, *own_draft) if own_draft else None
+# Stage timings of the last preview, shown in the diagnostics panel
+if 'preview_trace' not in st.session_state:
+    st.session_state.preview_trace = None
+
+# The launcher sets PARIKSHA_WARMUP so the first Print PDF does not wait for the PDF libraries to load
+if os.environ.get("PARIKSHA_WARMUP"):
+    warm_up_renderer()
+
+# Set when a background PDF render is running on a Streamlit without fragments, so the whole page refreshes its progress
+poll_pdf_job = False
 
 # Load existing paper
 st.subheader("Load Existing Paper")
 os.makedirs("metadata", exist_ok=True)
-papers = [f[:-5] for f in os.listdir("metadata") if f.endswith('.json')]
-selected_paper = st.selectbox("Select Paper to Load", [""] + papers, key="load_paper")
+paper_catalog = get_paper_catalog()
+# Pick up papers saved outside this server once per session; saves from the app update the catalog directly
+if 'catalog_synced' not in st.session_state:
+    paper_catalog.sync()
+    st.session_state.catalog_synced = True
+col_search, col_subject, col_rescan = st.columns([3, 2, 1])
+with col_search:
+    paper_search = st.text_input("🔍 Search Papers", key="paper_search")
+with col_subject:
+    paper_subject = st.selectbox("📚 Subject", [""] + paper_catalog.subjects(), key="paper_subject")
+with col_rescan:
+    if st.button("🔄 Rescan", key="rescan_btn"):
+        paper_catalog.sync()
+paper_rows = {row[0]: row for row in paper_catalog.search(paper_search, paper_subject)}
+selected_paper = st.selectbox(
+    "Select Paper to Load", [""] + list(paper_rows), key="load_paper",
+    format_func=lambda name: f"{name} ({paper_rows[name][1] or 'No subject'}, {paper_rows[name][4]} marks)" if name else ""
+)
 if st.button("📂 Load", key="load_btn"):
     metadata_path = os.path.join("metadata", f"{selected_paper}.json")
     try:
-        with open(metadata_path, 'r') as f:
-            data = json.load(f)
-        st.session_state.font_style = data['font_style']
-        st.session_state.font_size = data['font_size']
-        st.session_state.line_spacing = data['line_spacing']
-        st.session_state.pagination = data['pagination']
-        st.session_state.marks_position = data.get('marks_position', 'Beginning')
-        # Clear existing cells
-        st.session_state.cells = []
-        # Add cells from metadata
-        for cell_data in data['cells']:
-            cell_type = cell_data['type']
-            if cell_type == 'textbox':
-                cell = Cell(
-                    cell_type="textbox",
-                    code=cell_data['text'],
-                    metadata={
-                        'question_num': cell_data['question_num'],
-                        'marks': cell_data['marks'],
-                        'center': cell_data['center'],
-                        'table_rows': cell_data['table_rows'],
-                        'table_cols': cell_data['table_cols']
-                    }
-                )
-                st.session_state.cells.append(cell)
-            elif cell_type == 'pagebreak':
-                cell = Cell(cell_type="pagebreak", code="📄 Page Break")
-                st.session_state.cells.append(cell)
-            elif cell_type == 'end':
-                cell = Cell(cell_type="end", code="🏁 ----End of Paper ----")
-                st.session_state.cells.append(cell)
-        st.session_state.paper_name = selected_paper
-        st.session_state.show_markdown_help = {f"md_help_{i}": False for i in range(len(data['cells']))}
+        data = load_metadata(metadata_path)
+        apply_paper(selected_paper, data)
+        st.session_state.paper_versions[selected_paper] = paper_version(data)
+        st.session_state.save_conflict = None
+        # The paper's latest unsaved draft, which may come from a browser that was closed
+        found = paper_draft(selected_paper)
+        st.session_state.autosave_draft = (found[0], selected_paper, found[1]) if found else None
         st.success(f"Loaded {selected_paper}")
         st.rerun()
     except Exception as e:
         st.error(f"Error loading file: {e}")
 
-# Top options for font, size, spacing, pagination, marks position
-col1, col2, col3, col4, col5 = st.columns(5)
+# Offer to restore edits that were autosaved but never saved, e.g. after the browser disconnected
+if st.session_state.autosave_draft is not None:
+    draft_owner_id, draft_name, draft = st.session_state.autosave_draft
+    draft_time = time.strftime("%d %b %Y %H:%M", time.localtime(draft['saved_at']))
+    st.warning(f"♻️ Unsaved changes to {draft_name} from {draft_time} were autosaved")
+    col_restore, col_discard = st.columns(2)
+    with col_restore:
+        if st.button("♻️ Restore Draft", key="restore_draft_btn"):
+            metadata_path = os.path.join("metadata", f"{draft_name}.json")
+            if os.path.exists(metadata_path):
+                st.session_state.paper_versions[draft_name] = paper_version(load_metadata(metadata_path))
+            apply_paper(draft_name, draft['metadata'])
+            st.session_state.autosave_draft = None
+            st.rerun()
+    with col_discard:
+        if st.button("🗑️ Discard Draft", key="discard_draft_btn"):
+            autosaver.discard(draft_owner_id, draft_name)
+            st.session_state.autosave_draft = None
+            st.rerun()
+
+# Top options for font, size, spacing, pagination, marks position, print profile
+col1, col2, col3, col4, col5, col6 = st.columns(6)
 with col1:
     st.selectbox("🅰️ Font Style", ["Arial", "Times New Roman", "Courier New", "Verdana"], key='font_style')
 with col2:
@@ -611,6 +440,8 @@ with col4:
     st.checkbox("📄 Pagination", key='pagination')
 with col5:
     st.selectbox("🏷️ Marks Position", ["Beginning", "End"], key='marks_position')
+with col6:
+    st.selectbox("🖨️ Print Profile", list(PRINT_PROFILES), key='print_profile', on_change=apply_print_profile)
 
 # Paper name
 st.text_input("📝 Paper Name", key='paper_name')
@@ -620,25 +451,15 @@ st.subheader("Add New Cell")
 cell_type_top = st.selectbox("Cell Type", ["Text Box", "Page Break", "End"], key="cell_type_top")
 if st.button("➕ Add Cell", key="add_cell_top"):
     if cell_type_top == "Text Box":
-        cell = Cell(
-            cell_type="textbox",
-            code="",
-            metadata={
-                'question_num': 1,
-                'marks': 0,
-                'center': False,
-                'table_rows': 2,
-                'table_cols': 2
-            }
-        )
+        cell = Cell(cell_type="textbox", code="")
         st.session_state.cells.append(cell)
-        st.session_state.show_markdown_help[f"md_help_{len(st.session_state.cells)-1}"] = False
     elif cell_type_top == "Page Break":
         cell = Cell(cell_type="pagebreak", code="📄 Page Break")
         st.session_state.cells.append(cell)
     elif cell_type_top == "End":
         cell = Cell(cell_type="end", code="🏁 ----End of Paper ----")
         st.session_state.cells.append(cell)
+    show_cell_page((len(st.session_state.cells) - 1) // CELLS_PER_PAGE)
     st.rerun()
 
 # Markdown Help content
@@ -663,8 +484,48 @@ markdown_help_content = """
 - **Section Header**: `<p style="text-align: center;"><strong>Section Name</strong></p>`
 """
 
+# Only the cells on the current page get widgets; the outline lists the whole paper
+page_count = max(1, -(-len(st.session_state.cells) // CELLS_PER_PAGE))
+if st.session_state.cell_page >= page_count:
+    show_cell_page(page_count - 1)
+if st.session_state.cells:
+    with st.expander(f"📋 Outline ({len(st.session_state.cells)} cells)", expanded=False):
+        st.markdown("\n".join(
+            f"{idx + 1}. {cell_outline(cell)}" for idx, cell in enumerate(st.session_state.cells)
+        ))
+# Question numbers, marks and centering of every text box in one table, applied in a single update
+textbox_cells = [cell for cell in st.session_state.cells if cell.type == 'textbox']
+if textbox_cells:
+    with st.expander(f"🧮 Question Grid ({sum(cell.marks for cell in textbox_cells)} marks)", expanded=False):
+        with st.form("question_grid"):
+            grid = st.data_editor(
+                {
+                    'Q#': [cell.question_num for cell in textbox_cells],
+                    'Marks': [cell.marks for cell in textbox_cells],
+                    'Center': [cell.center for cell in textbox_cells],
+                    'Text': [" ".join(cell.code.split())[:80] for cell in textbox_cells]
+                },
+                column_config={
+                    'Q#': st.column_config.NumberColumn(min_value=0, step=1),
+                    'Marks': st.column_config.NumberColumn(min_value=0, step=1),
+                    'Text': st.column_config.TextColumn(disabled=True, width="large")
+                },
+                hide_index=True, num_rows="fixed", use_container_width=True, key="question_grid_editor"
+            )
+            if st.form_submit_button("✅ Apply"):
+                apply_question_grid(textbox_cells, grid)
+                st.rerun()
+
+if page_count > 1:
+    cell_count = len(st.session_state.cells)
+    page_labels = [f"{page * CELLS_PER_PAGE + 1}-{min((page + 1) * CELLS_PER_PAGE, cell_count)} of {cell_count}" for page in range(page_count)]
+    page_label = st.selectbox("📑 Cells", page_labels, index=st.session_state.cell_page, key="cell_page_select")
+    st.session_state.cell_page = page_labels.index(page_label)
+page_start = st.session_state.cell_page * CELLS_PER_PAGE
+
 # Display and edit cells
-for idx, cell in enumerate(st.session_state.cells):
+for idx in range(page_start, min(page_start + CELLS_PER_PAGE, len(st.session_state.cells))):
+    cell = st.session_state.cells[idx]
     with st.expander(f"Cell {idx+1}: {cell.type.capitalize()}", expanded=True):
         # Toolbar with editor controls (left) and cell controls (right)
         col_left, col_right = st.columns([3, 1])
@@ -673,33 +534,33 @@ for idx, cell in enumerate(st.session_state.cells):
                 col_qnum, col_marks, col_rows, col_cols, col_insert, col_center, col_browse = st.columns([1, 1, 1, 1, 1, 1, 1])
                 with col_qnum:
                     st.markdown('<div class="input-group input-group-sm"><span class="input-group-text">Q#</span></div>', unsafe_allow_html=True)
-                    cell.metadata['question_num'] = st.number_input(
-                        "", min_value=0, value=cell.metadata.get('question_num', 1),
-                        key=f"qnum_{idx}", label_visibility="collapsed"
+                    cell.question_num = st.number_input(
+                        "", min_value=0, value=cell.question_num,
+                        key=f"qnum_{cell.id}", label_visibility="collapsed"
                     )
                 with col_marks:
                     st.markdown('<div class="input-group input-group-sm"><span class="input-group-text">Marks</span></div>', unsafe_allow_html=True)
-                    cell.metadata['marks'] = st.number_input(
-                        "", min_value=0, value=cell.metadata.get('marks', 0),
-                        key=f"marks_{idx}", label_visibility="collapsed"
+                    cell.marks = st.number_input(
+                        "", min_value=0, value=cell.marks,
+                        key=f"marks_{cell.id}", label_visibility="collapsed"
                     )
                 with col_rows:
                     st.markdown('<div class="input-group input-group-sm"><span class="input-group-text">Rows</span></div>', unsafe_allow_html=True)
-                    cell.metadata['table_rows'] = st.number_input(
-                        "", min_value=1, max_value=20, value=cell.metadata.get('table_rows', 2),
-                        key=f"rows_{idx}", label_visibility="collapsed"
+                    cell.table_rows = st.number_input(
+                        "", min_value=1, max_value=20, value=cell.table_rows,
+                        key=f"rows_{cell.id}", label_visibility="collapsed"
                     )
                 with col_cols:
                     st.markdown('<div class="input-group input-group-sm"><span class="input-group-text">Cols</span></div>', unsafe_allow_html=True)
-                    cell.metadata['table_cols'] = st.number_input(
-                        "", min_value=1, max_value=20, value=cell.metadata.get('table_cols', 2),
-                        key=f"cols_{idx}", label_visibility="collapsed"
+                    cell.table_cols = st.number_input(
+                        "", min_value=1, max_value=20, value=cell.table_cols,
+                        key=f"cols_{cell.id}", label_visibility="collapsed"
                     )
                 with col_insert:
                     st.markdown('<div class="input-group input-group-sm"><span class="input-group-text">+</span></div>', unsafe_allow_html=True)
-                    if st.button("Insert Table", key=f"insert_table_{idx}", use_container_width=True):
-                        rows = cell.metadata['table_rows']
-                        cols = cell.metadata['table_cols']
+                    if st.button("Insert Table", key=f"insert_table_{cell.id}", use_container_width=True):
+                        rows = cell.table_rows
+                        cols = cell.table_cols
                         header = "| " + " | ".join([f"Col{i+1}" for i in range(cols)]) + " |"
                         separator = "| " + " --- |" * cols
                         table_rows = ["| " + " | ".join([" " for _ in range(cols)]) + " |" for _ in range(rows)]
@@ -708,40 +569,33 @@ for idx, cell in enumerate(st.session_state.cells):
                         st.rerun()
                 with col_center:
                     st.markdown('<div class="input-group input-group-sm"><span class="input-group-text">Center</span></div>', unsafe_allow_html=True)
-                    cell.metadata['center'] = st.checkbox(
-                        "", value=cell.metadata.get('center', False),
-                        key=f"center_{idx}", label_visibility="collapsed"
+                    cell.center = st.checkbox(
+                        "", value=cell.center,
+                        key=f"center_{cell.id}", label_visibility="collapsed"
                     )
                 with col_browse:
                     st.markdown('<div class="input-group input-group-sm"><span class="input-group-text">Browse</span></div>', unsafe_allow_html=True)
                     # Toggle file uploader when button is clicked
-                    show_uploader_key = f"show_uploader_{idx}"
-                    if st.button("Browse Files", key=f"browse_btn_{idx}", use_container_width=True):
+                    show_uploader_key = f"show_uploader_{cell.id}"
+                    if st.button("Browse Files", key=f"browse_btn_{cell.id}", use_container_width=True):
                         st.session_state[show_uploader_key] = not st.session_state.get(show_uploader_key, False)
 
                     # Show file uploader if button was clicked
                     if st.session_state.get(show_uploader_key, False):
                         uploader = st.file_uploader(
-                            "Select an image file", type=["png", "jpg", "jpeg"], key=f"browse_{idx}",
+                            "Select an image file", type=["png", "jpg", "jpeg"], key=f"browse_{cell.id}",
                             accept_multiple_files=False
                         )
                         # Track processed files to prevent infinite rerun
-                        processed_key = f"processed_file_{idx}"
+                        processed_key = f"processed_file_{cell.id}"
                         if uploader and (processed_key not in st.session_state or st.session_state[processed_key] != uploader.name):
                             # Read file content
                             file_bytes = uploader.read()
 
-                            # Create downloads directory and save file locally (for reference)
-                            downloads_dir = "downloads"
-                            os.makedirs(downloads_dir, exist_ok=True)
-                            file_path = os.path.join(downloads_dir, uploader.name)
-                            with open(file_path, "wb") as f:
-                                f.write(file_bytes)
-
-                            # Create base64 data URI for embedding in markdown (works in preview and PDF)
-                            img_data = base64.b64encode(file_bytes).decode()
+                            # Resample the image for the paper's page, store it once under its content hash and link it by reference
                             img_type = uploader.type.split("/")[1]
-                            img_md = f"\n\n![](data:image/{img_type};base64,{img_data})\n\n"
+                            asset_name = ingest_image(file_bytes, img_type, print_profile(st.session_state.print_profile))
+                            img_md = f"\n\n{asset_markdown(asset_name)}\n\n"
                             cell.code += img_md
 
                             # Mark file as processed and hide uploader
@@ -751,59 +605,61 @@ for idx, cell in enumerate(st.session_state.cells):
         with col_right:
             col_up, col_down, col_delete, col_help = st.columns(4)
             with col_up:
-                if st.button("↑", key=f"move_up_{idx}", disabled=idx == 0, use_container_width=True):
+                if st.button("↑", key=f"move_up_{cell.id}", disabled=idx == 0, use_container_width=True):
                     st.session_state.cells[idx], st.session_state.cells[idx-1] = st.session_state.cells[idx-1], st.session_state.cells[idx]
+                    show_cell_page((idx - 1) // CELLS_PER_PAGE)
                     st.rerun()
             with col_down:
-                if st.button("↓", key=f"move_down_{idx}", disabled=idx == len(st.session_state.cells) - 1, use_container_width=True):
+                if st.button("↓", key=f"move_down_{cell.id}", disabled=idx == len(st.session_state.cells) - 1, use_container_width=True):
                     st.session_state.cells[idx], st.session_state.cells[idx+1] = st.session_state.cells[idx+1], st.session_state.cells[idx]
+                    show_cell_page((idx + 1) // CELLS_PER_PAGE)
                     st.rerun()
             with col_delete:
-                if st.button("🗑", key=f"delete_{idx}", use_container_width=True):
-                    st.session_state[f"confirm_delete_{idx}"] = True
+                if st.button("🗑", key=f"delete_{cell.id}", use_container_width=True):
+                    st.session_state[f"confirm_delete_{cell.id}"] = True
             with col_help:
-                if cell.type == 'textbox' and st.button("📖", key=f"md_help_{idx}", use_container_width=True):
-                    st.session_state.show_markdown_help[f"md_help_{idx}"] = not st.session_state.show_markdown_help.get(f"md_help_{idx}", False)
+                if cell.type == 'textbox' and st.button("📖", key=f"md_help_{cell.id}", use_container_width=True):
+                    st.session_state.show_markdown_help[cell.id] = not st.session_state.show_markdown_help.get(cell.id, False)
 
         # Delete confirmation
-        if st.session_state.get(f"confirm_delete_{idx}", False):
+        if st.session_state.get(f"confirm_delete_{cell.id}", False):
             col_yes, col_no = st.columns(2)
             with col_yes:
-                if st.button("Yes, Delete", key=f"confirm_yes_{idx}"):
+                if st.button("Yes, Delete", key=f"confirm_yes_{cell.id}"):
                     st.session_state.cells.pop(idx)
-                    del st.session_state[f"confirm_delete_{idx}"]
+                    forget_cell_widgets(cell.id)
                     st.rerun()
             with col_no:
-                if st.button("Cancel", key=f"confirm_no_{idx}"):
-                    st.session_state[f"confirm_delete_{idx}"] = False
+                if st.button("Cancel", key=f"confirm_no_{cell.id}"):
+                    st.session_state[f"confirm_delete_{cell.id}"] = False
                     st.rerun()
 
         if cell.type == 'textbox':
             # Show markdown help if toggled
-            if st.session_state.show_markdown_help.get(f"md_help_{idx}", False):
+            if st.session_state.show_markdown_help.get(cell.id, False):
                 st.markdown(markdown_help_content, unsafe_allow_html=True)
 
             # Markdown editor with conditional styling
 #            st.markdown('<p style="font-size: small;">✏️ Text (Markdown supported)</p>', unsafe_allow_html=True)
 
             # Apply center alignment if center checkbox is selected
-            if cell.metadata.get('center', False):
+            if cell.center:
                 st.markdown(f"""
                 <style>
-                .centered-text-editor_{idx} textarea {{
+                .centered-text-editor_{cell.id} textarea {{
                     text-align: center !important;
                 }}
                 </style>
-                <div class="centered-text-editor_{idx}">
+                <div class="centered-text-editor_{cell.id}">
                 """, unsafe_allow_html=True)
 
             cell.code = st.text_area(
-                "", value=cell.code, key=f"editor_{idx}", height=300,
+                "", value=cell.code, key=f"editor_{cell.id}", height=300,
                 placeholder="Enter markdown content here..."
             )
 
             # Close the div wrapper if center alignment was applied
-            if cell.metadata.get('center', False):
+            if cell.center:
                 st.markdown("</div>", unsafe_allow_html=True)
 
         elif cell.type == 'pagebreak':
@@ -812,147 +668,116 @@ for idx, cell in enumerate(st.session_state.cells):
         elif cell.type == 'end':
             st.write("🏁 ----End of Paper ----")
 
-            # Save, Preview, Print PDF buttons
-            def generate_md(cells, paper_name, marks_position="Beginning"):
-                md = ""
-                for idx, cell in enumerate(cells):
-                    if cell.type == 'textbox':
-                        question_num = cell.metadata.get('question_num', 0)
-                        marks = cell.metadata.get('marks', 0)
-                        text = cell.code.strip()
-
-                        # Build the question content based on marks position
-                        content = ""
-
-                        if marks_position == "Beginning":
-                            # Add marks first if specified
-                            if marks > 0:
-                                content += f"**[Marks: {marks}]** "
-                            # Add question number if specified
-                            if question_num > 0:
-                                content += f"**(Q{question_num})** "
-                            # Add the main text content
-                            if cell.metadata.get('center', False):
-                                content += f"<div style=\"text-align: center;\">\n{text}\n</div>"
-                            else:
-                                content += text
-                        else:  # marks_position == "End"
-                            # Add question number first if specified
-                            if question_num > 0:
-                                content += f"**(Q{question_num})** "
-                            # Add the main text content
-                            if cell.metadata.get('center', False):
-                                content += f"<div style=\"text-align: center;\">\n{text}\n</div>"
-                            else:
-                                content += text
-                            # Add marks at the end if specified
-                            if marks > 0:
-                                content += f" **[Marks: {marks}]**"
-
-                        # Wrap first cell with special class to exclude from global font settings
-                        if idx == 0:
-                            content = f'<div class="first-cell-no-global-font">\n{content}\n</div>'
-
-                        md += content + "\n\n"
-
-                    elif cell.type == 'pagebreak':
-                        md += '<div class="page-break"></div>\n\n'
-                    elif cell.type == 'end':
-#                        md += '<center>----End of Paper ----</center>\n'
-                        md += f"<div style=\"text-align: center;\">\n** End of Paper ** \n</div>"
-                return md
-
-            col_save, col_preview, col_pdf = st.columns(3)
-            with col_save:
-                if st.button("💾 Save", key="save_btn"):
-                    paper_name = st.session_state.paper_name or "Untitled"
-                    md_content = generate_md(st.session_state.cells, paper_name, st.session_state.marks_position)
-                    dir_path = "papers"
-                    os.makedirs(dir_path, exist_ok=True)
-                    file_path = os.path.join(dir_path, f"{paper_name}.md")
-                    with open(file_path, 'w') as f:
-                        f.write(md_content)
-
-                    # Save metadata JSON
-                    metadata_dir = "metadata"
-                    os.makedirs(metadata_dir, exist_ok=True)
-                    metadata_path = os.path.join(metadata_dir, f"{paper_name}.json")
-                    metadata = {
-                        'font_style': st.session_state.font_style,
-                        'font_size': st.session_state.font_size,
-                        'line_spacing': st.session_state.line_spacing,
-                        'pagination': st.session_state.pagination,
-                        'marks_position': st.session_state.marks_position,
-                        'cells': [
-                            {
-                                'type': cell.type,
-                                'text': cell.code,
-                                'question_num': cell.metadata.get('question_num', 1),
-                                'marks': cell.metadata.get('marks', 0),
-                                'center': cell.metadata.get('center', False),
-                                'table_rows': cell.metadata.get('table_rows', 2),
-                                'table_cols': cell.metadata.get('table_cols', 2)
-                            } for cell in st.session_state.cells
-                        ]
-                    }
-                    with open(metadata_path, 'w') as f:
-                        json.dump(metadata, f, default=str)
-                    st.success(f"Saved to {file_path} and {metadata_path}")
-
-            with col_preview:
-                # Toggle preview button
-                preview_label = "🙈 Close Preview" if st.session_state.show_preview else "👁️ Preview"
-                if st.button(preview_label, key="preview_btn"):
-                    st.session_state.show_preview = not st.session_state.show_preview
-                    st.rerun()
-
-                # Show preview if toggled on
-                if st.session_state.show_preview:
-                    md_content = generate_md(st.session_state.cells, st.session_state.paper_name or "Untitled", st.session_state.marks_position)
-                    html_content = generate_html(md_content, st.session_state.font_style, st.session_state.font_size, st.session_state.line_spacing, st.session_state.pagination)
-                    st.components.v1.html(html_content, height=600, scrolling=True)
-
-            with col_pdf:
-                if st.button("🖨️ Print PDF", key="pdf_btn"):
-                    md_content = generate_md(st.session_state.cells, st.session_state.paper_name or "Untitled", st.session_state.marks_position)
-                    pdf_bytes = generate_pdf_from_markdown(
-                        md_content,
-                        st.session_state.font_style,
-                        st.session_state.font_size,
-                        st.session_state.line_spacing,
-                        st.session_state.pagination
-                    )
-                    if pdf_bytes:
-                        st.download_button(
-                            label="Download PDF",
-                            data=pdf_bytes,
-                            file_name=f"{st.session_state.paper_name or 'Untitled'}.pdf",
-                            mime="application/pdf"
-                        )
-                    else:
-                        st.error("Failed to generate PDF. Please check if markdown-pdf is installed: pip install markdown-pdf")
-
         # Add cell button below each cell
-        cell_type = st.selectbox("Cell Type", ["Text Box", "Page Break", "End"], key=f"cell_type_{idx}")
-        if st.button("➕ Add Cell Below", key=f"add_cell_{idx}"):
+        cell_type = st.selectbox("Cell Type", ["Text Box", "Page Break", "End"], key=f"cell_type_{cell.id}")
+        if st.button("➕ Add Cell Below", key=f"add_cell_{cell.id}"):
             if cell_type == "Text Box":
-                new_cell = Cell(
-                    cell_type="textbox",
-                    code="",
-                    metadata={
-                        'question_num': 1,
-                        'marks': 0,
-                        'center': False,
-                        'table_rows': 2,
-                        'table_cols': 2
-                    }
-                )
+                new_cell = Cell(cell_type="textbox", code="")
                 st.session_state.cells.insert(idx + 1, new_cell)
-                st.session_state.show_markdown_help[f"md_help_{idx+1}"] = False
             elif cell_type == "Page Break":
                 new_cell = Cell(cell_type="pagebreak", code="📄 Page Break")
                 st.session_state.cells.insert(idx + 1, new_cell)
             elif cell_type == "End":
                 new_cell = Cell(cell_type="end", code="🏁 ----End of Paper ----")
                 st.session_state.cells.insert(idx + 1, new_cell)
+            show_cell_page((idx + 1) // CELLS_PER_PAGE)
+            st.rerun()
+
+# Save, Preview, Print PDF buttons, below the cells so they can be reached from any page
+if st.session_state.cells:
+    st.divider()
+    col_save, col_preview, col_pdf = st.columns(3)
+    with col_save:
+        if st.button("💾 Save", key="save_btn"):
+            save_current_paper()
+        if st.session_state.save_conflict:
+            st.warning(st.session_state.save_conflict)
+            if st.button("💾 Save anyway", key="save_force_btn"):
+                save_current_paper(force=True)
+
+    with col_preview:
+        # Toggle preview button
+        preview_label = "🙈 Close Preview" if st.session_state.show_preview else "👁️ Preview"
+        if st.button(preview_label, key="preview_btn"):
+            st.session_state.show_preview = not st.session_state.show_preview
             st.rerun()
+
+        # Show preview if toggled on
+        if st.session_state.show_preview:
+            trace = RenderTrace("preview", paper=st.session_state.paper_name or "Untitled", cells=len(st.session_state.cells))
+            try:
+                with trace.activate():
+                    html_content = generate_preview_html(
+                        st.session_state.cells,
+                        st.session_state.font_style,
+                        st.session_state.font_size,
+                        st.session_state.line_spacing,
+                        st.session_state.pagination,
+                        st.session_state.marks_position,
+                        st.session_state.print_profile
+                    )
+            except RenderMemoryError as e:
+                trace.finish(error=str(e))
+                st.error(str(e))
+            else:
+                trace.finish(html_bytes=len(html_content.encode('utf-8')))
+                st.components.v1.html(html_content, height=600, scrolling=True)
+            st.session_state.preview_trace = trace.record()
+
+    with col_pdf:
+        if st.button("🖨️ Print PDF", key="pdf_btn"):
+            trace = RenderTrace("pdf", paper=st.session_state.paper_name or "Untitled", cells=len(st.session_state.cells))
+            with trace.activate():
+                md_content = generate_md(st.session_state.cells, st.session_state.paper_name or "Untitled", st.session_state.marks_position)
+            trace.attrs.update(content_stats(md_content))
+            job = render_jobs.submit(
+                md_content,
+                st.session_state.font_style,
+                st.session_state.font_size,
+                st.session_state.line_spacing,
+                st.session_state.pagination,
+                st.session_state.print_profile,
+                owner=st.session_state.session_id,
+                trace=trace
+            )
+            st.session_state.pdf_job = job.id
+
+        job = render_jobs.get(st.session_state.pdf_job) if st.session_state.pdf_job else None
+        if job is not None and job.status == "running" and _fragment is not None:
+            _fragment(run_every=PDF_POLL_SECONDS)(show_pdf_job)(polling=True)
+        else:
+            poll_pdf_job = show_pdf_job()
+
+    # Where the time of the last preview and PDF render went
+    if st.checkbox("🩺 Render Diagnostics", key="show_diagnostics"):
+        job = render_jobs.get(st.session_state.pdf_job) if st.session_state.pdf_job else None
+        traces = [("Preview", st.session_state.preview_trace), ("PDF", job.trace.record() if job is not None else None)]
+        diag_cols = st.columns(len(traces))
+        for diag_col, (title, record) in zip(diag_cols, traces):
+            with diag_col:
+                st.markdown(f"**{title}**")
+                if record is None:
+                    st.caption("Not rendered yet")
+                    continue
+                st.caption(" · ".join(
+                    f"{name}: {value}" for name, value in record.items() if name not in ('kind', 'stages_ms', 'memory_kb')
+                ))
+                memory = record.get('memory_kb', {})
+                st.dataframe(
+                    [{"Stage": stage, "ms": ms, "KB": memory.get(stage)} for stage, ms in record['stages_ms'].items()],
+                    hide_index=True,
+                    use_container_width=True
+                )
+        st.caption("PDF sections render in parallel, so their stage times can add up to more than the elapsed time.")
+
+# Hand edits to the autosaver, which writes them on its own thread once editing pauses
+if st.session_state.cells:
+    snapshot = current_metadata()
+    if snapshot != st.session_state.autosave_snapshot:
+        st.session_state.autosave_snapshot = snapshot
+        autosaver.schedule(st.session_state.draft_owner, st.session_state.paper_name or "Untitled", snapshot)
+
+# Refresh while a background PDF render is in progress
+if poll_pdf_job:
+    time.sleep(PDF_POLL_SECONDS)
+    st.rerun()
@@ -29,6 +29,9 @@ hidden_imports = [
     'socket',
     'threading',
     'subprocess',
+    # PDF renders run on a process pool; app.py is bundled as data, so its imports are listed here
+    'multiprocessing',
+    'concurrent.futures.process',
     'PyMuPDF',
     'fitz'
 ]
@@ -46,6 +49,17 @@ a = Analysis(
     datas=[
         ('app.py', '.'),
         ('header.py', '.'),
+        ('assets.py', '.'),
+        ('catalog.py', '.'),
+        ('storage.py', '.'),
+        ('autosave.py', '.'),
+        ('paper.py', '.'),
+        ('preprocess.py', '.'),
+        ('render.py', '.'),
+        ('profiles.py', '.'),
+        ('fonts.py', '.'),
+        ('tracing.py', '.'),
+        ('jobs.py', '.'),
         ('README.md', '.'),
         ('requirements.txt', '.'),
         *streamlit_data,
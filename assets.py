@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Image asset store for Pariksha - Question Paper Drafting System
+Stores uploaded images once under their content hash and refers to them from markdown as asset:<hash>.<ext>
+"""
+
+import os
+import re
+import time
+import base64
+import hashlib
+import argparse
+import tempfile
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+from profiles import content_width_in, print_profile
+
+ASSETS_DIR = "assets"
+
+# Uploads as received, kept next to the downscaled copy used in papers
+ORIGINALS_DIR = "originals"
+
+# Images are resampled for this print resolution across the printable width of the page
+PRINT_DPI = 200
+
+# Directories whose files may reference assets
+REFERENCE_DIRS = ("metadata", "papers", "autosave")
+
+# PyMuPDF must not be used from several threads at once; every call in a process goes through this lock
+FITZ_LOCK = threading.RLock()
+
+IMAGE_EXTENSIONS = ("png", "jpg", "jpeg", "gif", "webp")
+
+# asset:<sha256>.<ext> as written into markdown image links
+ASSET_REF_PATTERN = re.compile(r'asset:([0-9a-f]{64}\.(?:png|jpg|jpeg|gif|webp))')
+
+# Inline base64 images embedded by earlier versions of the app
+DATA_URI_IMAGE_PATTERN = re.compile(r'!\[([^\]]*)\]\(data:image/([a-z]+);base64,([A-Za-z0-9+/=]+)\)')
+
+
+def store_asset(data, ext, assets_dir=ASSETS_DIR):
+    """Store image bytes under their content hash and return the asset name"""
+    ext = ext.lower().replace("jpeg", "jpg")
+    if ext not in IMAGE_EXTENSIONS:
+        raise ValueError(f"Unsupported image type: {ext}")
+    name = f"{hashlib.sha256(data).hexdigest()}.{ext}"
+    asset_file = Path(assets_dir) / name
+    if not asset_file.exists():
+        Path(assets_dir).mkdir(parents=True, exist_ok=True)
+        # Write to a temp file first so a half-written asset is never visible under its hash
+        fd, temp_path = tempfile.mkstemp(dir=assets_dir, suffix=".tmp")
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, asset_file)
+    else:
+        # Refresh the age of a re-used asset so garbage collection leaves it alone until it is saved
+        os.utime(asset_file)
+    return name
+
+
+def target_width_px(profile=None, dpi=PRINT_DPI):
+    """Return the widest an image needs to be to print sharply across the page of a print profile"""
+    return int(content_width_in(profile or print_profile()) * dpi)
+
+
+def downscale_image(data, ext, max_width_px):
+    """Resample an image to at most max_width_px wide and re-encode it without metadata, returning bytes and extension"""
+    import fitz
+
+    ext = ext.lower().replace("jpeg", "jpg")
+    with FITZ_LOCK:
+        try:
+            # Opening the image as a document applies its EXIF orientation
+            with fitz.open(stream=data, filetype=ext) as doc:
+                page = doc[0]
+                raw = fitz.Pixmap(data)
+                zoom = max(raw.width, raw.height) / max(page.rect.width, page.rect.height)
+                width_px = page.rect.width * zoom
+                if width_px > max_width_px:
+                    zoom *= max_width_px / width_px
+                pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=bool(raw.alpha))
+        except Exception:
+            # Leave images MuPDF cannot decode as they are
+            return data, ext
+        pixmap.set_dpi(PRINT_DPI, PRINT_DPI)
+
+        if pixmap.alpha:
+            candidates = [(pixmap.tobytes("png"), "png")]
+        elif ext == "jpg":
+            candidates = [(pixmap.tobytes("jpg", jpg_quality=85), "jpg")]
+        else:
+            # Photos saved as PNG shrink a lot as JPEG; diagrams stay PNG to keep lines crisp
+            png = pixmap.tobytes("png")
+            jpg = pixmap.tobytes("jpg", jpg_quality=85)
+            candidates = [(jpg, "jpg") if len(jpg) < len(png) / 2 else (png, "png")]
+
+    new_data, new_ext = candidates[0]
+    # Keep an upload that was already small enough, unless it had to be rotated upright
+    if (pixmap.width, pixmap.height) == (raw.width, raw.height) and len(new_data) >= len(data):
+        return data, ext
+    return new_data, new_ext
+
+
+def ingest_image(data, ext, profile=None, assets_dir=ASSETS_DIR):
+    """Store an uploaded image resampled for print on the profile's page, keeping the original in the originals folder"""
+    new_data, new_ext = downscale_image(data, ext, target_width_px(profile))
+    name = store_asset(new_data, new_ext, assets_dir)
+    if new_data is not data:
+        originals_path = Path(assets_dir) / ORIGINALS_DIR
+        originals_path.mkdir(parents=True, exist_ok=True)
+        original_file = originals_path / f"{name.rsplit('.', 1)[0]}.{ext.lower()}"
+        if not original_file.exists():
+            original_file.write_bytes(data)
+    return name
+
+
+def asset_markdown(name, alt=""):
+    """Return the markdown image link for an asset"""
+    return f"![{alt}](asset:{name})"
+
+
+def referenced_assets(text):
+    """Return the names of all assets referenced in text"""
+    return set(ASSET_REF_PATTERN.findall(text))
+
+
+def asset_paths(md_content, prefix=ASSETS_DIR + "/"):
+    """Replace asset references with file paths for rendering"""
+    if 'asset:' not in md_content:
+        return md_content
+    return ASSET_REF_PATTERN.sub(lambda match: prefix + match.group(1), md_content)
+
+
+@lru_cache(maxsize=64)
+def _data_uri(name, assets_dir):
+    """Return an asset as a base64 data URI"""
+    ext = name.rsplit('.', 1)[1]
+    mime = "jpeg" if ext == "jpg" else ext
+    with open(Path(assets_dir) / name, 'rb') as f:
+        return f"data:image/{mime};base64,{base64.b64encode(f.read()).decode()}"
+
+
+def inline_assets(text, assets_dir=ASSETS_DIR):
+    """Replace asset references in markdown or HTML with data URIs, for HTML shown without access to the assets folder"""
+    if 'asset:' not in text:
+        return text
+
+    def replace(match):
+        try:
+            return _data_uri(match.group(1), assets_dir)
+        except OSError:
+            return match.group(0)
+
+    return ASSET_REF_PATTERN.sub(replace, text)
+
+
+def externalize_images(text, assets_dir=ASSETS_DIR):
+    """Move inline base64 images in text into the asset store and link them by reference"""
+    if 'base64,' not in text:
+        return text
+
+    def replace(match):
+        alt, img_type, img_data = match.groups()
+        if img_type not in IMAGE_EXTENSIONS:
+            return match.group(0)
+        return asset_markdown(store_asset(base64.b64decode(img_data), img_type, assets_dir), alt)
+
+    return DATA_URI_IMAGE_PATTERN.sub(replace, text)
+
+
+def collect_garbage(assets_dir=ASSETS_DIR, reference_dirs=REFERENCE_DIRS, min_age=24 * 3600, dry_run=False):
+    """Delete assets not referenced by any saved file and return their names"""
+    assets_path = Path(assets_dir)
+    if not assets_path.exists():
+        return []
+
+    referenced = set()
+    for reference_dir in reference_dirs:
+        reference_path = Path(reference_dir)
+        if not reference_path.exists():
+            continue
+        # Drafts are kept in a folder per browser tab
+        for file_path in reference_path.rglob("*"):
+            if file_path.is_file():
+                referenced |= referenced_assets(file_path.read_text(encoding='utf-8', errors='ignore'))
+
+    removed = []
+    now = time.time()
+    for asset_file in assets_path.iterdir():
+        if asset_file.name in referenced or not ASSET_REF_PATTERN.fullmatch(f"asset:{asset_file.name}"):
+            continue
+        # Recent uploads may belong to a paper that has not been saved yet
+        if now - asset_file.stat().st_mtime < min_age:
+            continue
+        if not dry_run:
+            asset_file.unlink()
+        removed.append(asset_file.name)
+
+    # Originals go with the resampled asset they were ingested as
+    originals_path = assets_path / ORIGINALS_DIR
+    if originals_path.exists():
+        kept = {asset_file.name.rsplit('.', 1)[0] for asset_file in assets_path.iterdir() if asset_file.name not in removed}
+        for original_file in originals_path.iterdir():
+            if original_file.stem not in kept:
+                if not dry_run:
+                    original_file.unlink()
+                removed.append(f"{ORIGINALS_DIR}/{original_file.name}")
+    return removed
+
+
+def main():
+    """Main function for command line usage"""
+    parser = argparse.ArgumentParser(description="Pariksha Image Asset Store")
+    parser.add_argument("command", choices=["gc"], help="gc: delete assets no saved paper refers to")
+    parser.add_argument("--assets-dir", default=ASSETS_DIR, help="Asset store directory")
+    parser.add_argument("--min-age-hours", type=float, default=24, help="Keep unreferenced assets younger than this")
+    parser.add_argument("--dry-run", "-n", action="store_true", help="List assets without deleting them")
+
+    args = parser.parse_args()
+
+    removed = collect_garbage(args.assets_dir, min_age=args.min_age_hours * 3600, dry_run=args.dry_run)
+    action = "Would remove" if args.dry_run else "Removed"
+    for name in removed:
+        print(f"🗑 {name}")
+    print(f"✅ {action} {len(removed)} unreferenced asset(s)")
+
+
+if __name__ == "__main__":
+    main()
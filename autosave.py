@@ -0,0 +1,164 @@
+"""
+Autosave for Pariksha - Question Paper Drafting System
+Writes debounced snapshots of papers being edited to autosave/ on a background thread
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import threading
+from pathlib import Path
+
+from storage import atomic_write, paper_lock, read_metadata
+
+AUTOSAVE_DIR = "autosave"
+
+# Wait this long after the last edit before writing, so a burst of edits is saved once
+AUTOSAVE_DELAY = 2.0
+
+# Drafts are kept per owner, one browser tab, so sessions editing papers of the same name never share one
+OWNER_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+
+def draft_path(owner, paper_name, autosave_dir=AUTOSAVE_DIR):
+    """Return the autosave file of one owner's draft of a paper"""
+    return Path(autosave_dir) / owner / f"{paper_name}.json"
+
+
+def new_owner():
+    """Return a new draft owner id for a browser tab"""
+    return uuid.uuid4().hex
+
+
+def valid_owner(owner):
+    """Return whether an owner id, e.g. one read from a URL, is safe to use as a folder name"""
+    return bool(owner) and OWNER_PATTERN.fullmatch(owner) is not None
+
+
+def load_draft(owner, paper_name, autosave_dir=AUTOSAVE_DIR):
+    """Return an owner's autosaved draft of a paper as {'saved_at', 'metadata'}, or None"""
+    try:
+        with open(draft_path(owner, paper_name, autosave_dir), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def recoverable_draft(owner, paper_name, metadata_dir="metadata", autosave_dir=AUTOSAVE_DIR):
+    """Return an owner's draft of a paper if it holds changes that were never saved, or None"""
+    draft = load_draft(owner, paper_name, autosave_dir)
+    if draft is None:
+        return None
+    metadata_path = Path(metadata_dir) / f"{paper_name}.json"
+    try:
+        if read_metadata(metadata_path) == draft['metadata']:
+            return None
+    except (OSError, ValueError):
+        pass
+    return draft
+
+
+def _owners(autosave_dir):
+    """Return the owners that have drafts"""
+    autosave_path = Path(autosave_dir)
+    if not autosave_path.exists():
+        return []
+    return [path.name for path in autosave_path.iterdir() if path.is_dir() and valid_owner(path.name)]
+
+
+def latest_draft(owner, metadata_dir="metadata", autosave_dir=AUTOSAVE_DIR):
+    """Return the name and draft of the owner's most recently autosaved paper with unsaved changes, or None"""
+    owner_path = Path(autosave_dir) / owner
+    if not owner_path.exists():
+        return None
+    for draft_file in sorted(owner_path.glob("*.json"), key=lambda path: path.stat().st_mtime, reverse=True):
+        draft = recoverable_draft(owner, draft_file.stem, metadata_dir, autosave_dir)
+        if draft is not None:
+            return draft_file.stem, draft
+    return None
+
+
+def paper_draft(paper_name, metadata_dir="metadata", autosave_dir=AUTOSAVE_DIR):
+    """Return the owner and draft of the most recent unsaved draft of a paper by anyone, or None
+
+    Offered when a paper is opened, so edits lost with a closed browser can be recovered from a new one.
+    """
+    drafts = []
+    for owner in _owners(autosave_dir):
+        draft = recoverable_draft(owner, paper_name, metadata_dir, autosave_dir)
+        if draft is not None:
+            drafts.append((draft['saved_at'], owner, draft))
+    if not drafts:
+        return None
+    _, owner, draft = max(drafts, key=lambda item: item[0])
+    return owner, draft
+
+
+class Autosaver:
+    """Debounce paper snapshots and write them from a single background thread"""
+
+    def __init__(self, autosave_dir=AUTOSAVE_DIR, delay=AUTOSAVE_DELAY):
+        self.autosave_dir = autosave_dir
+        self.delay = delay
+        self._pending = {}
+        self._generations = {}
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def schedule(self, owner, paper_name, metadata):
+        """Queue a snapshot of an owner's paper, replacing any snapshot of it not yet written"""
+        key = (owner, paper_name)
+        with self._condition:
+            generation = self._generations.get(key, 0)
+            self._pending[key] = (time.monotonic() + self.delay, time.time(), metadata, generation)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="pariksha-autosave", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def discard(self, owner, paper_name):
+        """Drop an owner's pending snapshot and draft of a paper, once it has been saved for real or thrown away"""
+        key = (owner, paper_name)
+        with self._condition:
+            self._pending.pop(key, None)
+            # Snapshots taken before now are stale even if the thread is already writing one
+            self._generations[key] = self._generations.get(key, 0) + 1
+        with paper_lock(paper_name):
+            try:
+                os.unlink(draft_path(owner, paper_name, self.autosave_dir))
+            except FileNotFoundError:
+                pass
+
+    def _run(self):
+        """Write snapshots as their quiet period ends"""
+        while True:
+            with self._condition:
+                while True:
+                    now = time.monotonic()
+                    due = [key for key, pending in self._pending.items() if pending[0] <= now]
+                    if due:
+                        break
+                    next_due = min((pending[0] for pending in self._pending.values()), default=None)
+                    self._condition.wait(None if next_due is None else next_due - now)
+                snapshots = [(key, self._pending.pop(key)) for key in due]
+            for (owner, paper_name), (_, saved_at, metadata, generation) in snapshots:
+                self._write(owner, paper_name, saved_at, metadata, generation)
+
+    def _write(self, owner, paper_name, saved_at, metadata, generation):
+        """Write one snapshot unless the paper was saved since it was taken"""
+        with paper_lock(paper_name):
+            with self._condition:
+                if self._generations.get((owner, paper_name), 0) != generation:
+                    return
+            try:
+                atomic_write(draft_path(owner, paper_name, self.autosave_dir),
+                             json.dumps({'saved_at': saved_at, 'metadata': metadata}, default=str))
+            except OSError:
+                # Keep the thread alive; the next edit tries again
+                pass
+
+
+# Shared by every session of the Streamlit server
+autosaver = Autosaver()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Batch PDF renderer for Pariksha - Question Paper Drafting System
+Renders every saved paper in metadata/ to PDF in parallel, skipping papers that have not changed
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from paper import cells_from_metadata, load_metadata, paper_settings
+from profiles import print_profile
+from render import content_hash, generate_md, generate_pdf_from_markdown, pdf_stylesheet
+from tracing import MEMORY_LIMIT_MB, RenderTrace, content_stats
+
+MANIFEST_NAME = ".render_manifest.json"
+
+
+def paper_job(metadata_path):
+    """Build the markdown, settings and render key for one saved paper"""
+    data = load_metadata(metadata_path)
+    name = Path(metadata_path).stem
+    marks_position = data.get('marks_position', 'Beginning')
+    md_content = generate_md(cells_from_metadata(data), name, marks_position)
+    settings = paper_settings(data)
+    profile = print_profile(settings[4], *settings[:3])
+    key = content_hash(pdf_stylesheet(profile) + '\0' + md_content)
+    return name, md_content, settings, key
+
+
+def render_paper(name, md_content, settings, output_dir, memory_limit_mb=None):
+    """Render one paper to PDF and return its name, PDF size in bytes and render time"""
+    start = time.perf_counter()
+    trace = RenderTrace("batch_pdf", memory_limit_mb, paper=name, **content_stats(md_content))
+    with trace.activate():
+        pdf_bytes = generate_pdf_from_markdown(md_content, *settings)
+    trace.finish(pdf_bytes=len(pdf_bytes))
+    output_file = Path(output_dir) / f"{name}.pdf"
+    with open(output_file, 'wb') as f:
+        f.write(pdf_bytes)
+    return name, len(pdf_bytes), time.perf_counter() - start
+
+
+def load_manifest(output_dir):
+    """Read the render keys of previously rendered papers"""
+    manifest_file = Path(output_dir) / MANIFEST_NAME
+    if not manifest_file.exists():
+        return {}
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(output_dir, manifest):
+    """Write the render keys of rendered papers"""
+    manifest_file = Path(output_dir) / MANIFEST_NAME
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=4, ensure_ascii=False)
+
+
+def batch_render(metadata_dir="metadata", output_dir="pdfs", workers=None, force=False, names=None, memory_limit_mb=None):
+    """Render saved papers in parallel and return per-paper results"""
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(output_dir)
+
+    metadata_files = sorted(Path(metadata_dir).glob("*.json"))
+    if names:
+        metadata_files = [path for path in metadata_files if path.stem in names]
+
+    results = []
+    pending = []
+    for metadata_path in metadata_files:
+        try:
+            name, md_content, settings, key = paper_job(metadata_path)
+        except (OSError, ValueError, KeyError) as e:
+            results.append((metadata_path.stem, "failed", 0, 0.0, f"invalid metadata: {e}"))
+            continue
+        if not force and manifest.get(name) == key and (Path(output_dir) / f"{name}.pdf").exists():
+            results.append((name, "skipped", 0, 0.0, ""))
+            continue
+        pending.append((name, md_content, settings, key))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(render_paper, name, md_content, settings, output_dir, memory_limit_mb): (name, key)
+            for name, md_content, settings, key in pending
+        }
+        for future in as_completed(futures):
+            name, key = futures[future]
+            try:
+                _, size, seconds = future.result()
+            except Exception as e:
+                results.append((name, "failed", 0, 0.0, str(e)))
+                continue
+            manifest[name] = key
+            results.append((name, "rendered", size, seconds, ""))
+            print(f"✅ {name}: {seconds:.2f}s")
+
+    save_manifest(output_dir, manifest)
+    return results
+
+
+def print_summary(results, elapsed):
+    """Print per-paper timings and totals"""
+    print("\n📋 Summary")
+    print("-" * 60)
+    for name, status, size, seconds, error in sorted(results, key=lambda result: -result[3]):
+        detail = f"{seconds:7.2f}s {size / 1024:9.0f} KB" if status == "rendered" else error
+        print(f"{status:>9}  {name:<30} {detail}")
+    print("-" * 60)
+    counts = {status: sum(1 for result in results if result[1] == status) for status in ("rendered", "skipped", "failed")}
+    render_time = sum(result[3] for result in results)
+    print(f"Rendered {counts['rendered']}, skipped {counts['skipped']}, failed {counts['failed']} "
+          f"in {elapsed:.2f}s wall time ({render_time:.2f}s render time)")
+
+
+def main():
+    """Main function for command line usage"""
+    parser = argparse.ArgumentParser(description="Pariksha Batch PDF Renderer")
+    parser.add_argument("papers", nargs="*", help="Paper names to render (default: all)")
+    parser.add_argument("--metadata-dir", "-m", default="metadata", help="Directory of saved paper metadata")
+    parser.add_argument("--output-dir", "-o", default="pdfs", help="Directory for rendered PDFs")
+    parser.add_argument("--workers", "-w", type=int, default=os.cpu_count(), help="Number of render processes")
+    parser.add_argument("--force", "-f", action="store_true", help="Render papers even if unchanged")
+    parser.add_argument("--memory-mb", type=float, default=MEMORY_LIMIT_MB,
+                        help="Fail papers whose render allocates more than this many MB (default: PARIKSHA_RENDER_MEMORY_MB, 0 for no limit)")
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = batch_render(args.metadata_dir, args.output_dir, args.workers, args.force, args.papers, args.memory_mb)
+    print_summary(results, time.perf_counter() - start)
+    return 1 if any(result[1] == "failed" for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
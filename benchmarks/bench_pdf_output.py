@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark for PDF output in Pariksha
+Compares saving through a temporary file with serializing the PyMuPDF document in memory
+"""
+
+import os
+import sys
+import base64
+import tempfile
+import argparse
+import time
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocess import preprocess_markdown
+from render import pdf_document_bytes
+
+
+def build_image(size_px):
+    """Build a noisy PNG that does not compress away, like a photographed diagram"""
+    import fitz
+
+    samples = os.urandom(size_px * size_px * 3)
+    pixmap = fitz.Pixmap(fitz.csRGB, size_px, size_px, samples, False)
+    return pixmap.tobytes("png")
+
+
+def build_paper(questions, images, image_px):
+    """Build an image-heavy synthetic question paper"""
+    parts = []
+    for q in range(1, questions + 1):
+        parts.append(f'**[Marks: 2]** **(Q{q})** Study the diagram and answer question {q}.\n\n')
+        if images and q % max(1, questions // images) == 0:
+            image = base64.b64encode(build_image(image_px)).decode()
+            parts.append(f'![](data:image/png;base64,{image})\n\n')
+    return preprocess_markdown(''.join(parts))
+
+
+def build_pdf(md_content):
+    """Lay out the paper with markdown-pdf"""
+    from markdown_pdf import MarkdownPdf, Section
+
+    pdf = MarkdownPdf(toc_level=2)
+    pdf.add_section(Section(md_content, toc=False))
+    return pdf
+
+
+def save_via_temp_file(pdf, tmpdir=None):
+    """Previous output path: save to a NamedTemporaryFile, read it back and unlink it"""
+    with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False, dir=tmpdir) as temp_file:
+        pdf.save(temp_file.name)
+        with open(temp_file.name, 'rb') as f:
+            pdf_bytes = f.read()
+        os.unlink(temp_file.name)
+    return pdf_bytes
+
+
+def main():
+    """Run the PDF output benchmark"""
+    parser = argparse.ArgumentParser(description="Pariksha PDF output benchmark")
+    parser.add_argument("--questions", type=int, default=30, help="Number of questions")
+    parser.add_argument("--images", type=int, default=5, help="Number of embedded images")
+    parser.add_argument("--image-px", type=int, default=400, help="Width and height of each image in pixels")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs")
+    parser.add_argument("--tmpdir", help="Directory for the temp file path, e.g. a disk-backed folder instead of tmpfs")
+    args = parser.parse_args()
+
+    md_content = build_paper(args.questions, args.images, args.image_px)
+    print(f"📄 Paper: {args.questions} questions, {args.images} images, {len(md_content) / 1024 / 1024:.1f} MB of markdown")
+
+    timings = {}
+    outputs = (
+        ("temp file", lambda pdf: save_via_temp_file(pdf, args.tmpdir)),
+        ("in memory", pdf_document_bytes),
+    )
+    for name, output in outputs:
+        # Layout is identical for both paths, so only the output step is timed
+        runs = []
+        for _ in range(args.repeat):
+            pdf = build_pdf(md_content)
+            start = time.perf_counter()
+            pdf_bytes = output(pdf)
+            runs.append(time.perf_counter() - start)
+        timings[name] = statistics.median(runs)
+        print(f"{name:>10}: {timings[name] * 1000:.1f} ms, {len(pdf_bytes) / 1024 / 1024:.1f} MB")
+
+    print(f"⚡ Speedup: {timings['temp file'] / timings['in memory']:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
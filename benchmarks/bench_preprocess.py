@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the markdown preprocessing step of Pariksha
+Compares the single-pass preprocessor with the previous three-pass implementation
+"""
+
+import os
+import re
+import sys
+import base64
+import argparse
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocess import preprocess_markdown
+
+
+def legacy_preprocess(md_content):
+    """Previous preprocessing: center-div loop, DOTALL header regex, option-list loop"""
+    lines = md_content.split('\n')
+    processed_lines = []
+    inside_center_div = False
+    for line in lines:
+        line_stripped = line.strip()
+        if line_stripped == '<div style="text-align: center;">':
+            inside_center_div = True
+        elif line_stripped == '</div>' and inside_center_div:
+            inside_center_div = False
+        elif inside_center_div:
+            if line_stripped.startswith('#'):
+                processed_lines.append(f'<center>{line_stripped}</center>')
+            elif line_stripped and not line_stripped.startswith('<') and not line_stripped.startswith('<!'):
+                processed_lines.append(f'<div style="text-align: center;">{line_stripped}</div>')
+            else:
+                processed_lines.append(line)
+        else:
+            processed_lines.append(line)
+    processed_md = '\n'.join(processed_lines)
+
+    header_pattern = r'<div style="text-align: center;">\s*(#{1,6}[^<]*?)\s*</div>'
+    processed_md = re.sub(header_pattern, r'<center>\1</center>', processed_md, flags=re.MULTILINE | re.DOTALL)
+
+    option_pattern = r'^([a-d])\)\s+(.+)$'
+    lines = processed_md.split('\n')
+    processed_lines = []
+    in_options = False
+    for line in lines:
+        match = re.match(option_pattern, line.strip())
+        if match:
+            if not in_options:
+                in_options = True
+                processed_lines.append('')
+            letter, text = match.groups()
+            processed_lines.append(f'1. {text}')
+        else:
+            if in_options and line.strip() == '':
+                in_options = False
+            processed_lines.append(line)
+    return '\n'.join(processed_lines)
+
+
+def build_paper(questions, images, image_kb):
+    """Build a synthetic question paper in the format produced by generate_md"""
+    image = base64.b64encode(os.urandom(image_kb * 1024)).decode()
+    parts = ['<div style="text-align: center;">\n# SCHOOL NAME\n## Annual Examination\n</div>\n\n']
+    for q in range(1, questions + 1):
+        if q % 30 == 1:
+            parts.append(f'<div style="text-align: center;">\n**SECTION {q // 30 + 1}**\n</div>\n\n')
+        parts.append(f'**[Marks: 1]** **(Q{q})** Choose the correct answer for question {q}:\n\n')
+        parts.append('a) First option\nb) Second option\nc) Third option\nd) Fourth option\n\n')
+        if images and q % max(1, questions // images) == 0:
+            parts.append(f'![](data:image/png;base64,{image})\n\n')
+    parts.append('<div style="text-align: center;">\n** End of Paper ** \n</div>')
+    return ''.join(parts)
+
+
+def main():
+    """Run the preprocessing benchmark"""
+    parser = argparse.ArgumentParser(description="Pariksha preprocessing benchmark")
+    parser.add_argument("--questions", type=int, default=150, help="Number of questions")
+    parser.add_argument("--images", type=int, default=10, help="Number of embedded images")
+    parser.add_argument("--image-kb", type=int, default=200, help="Size of each embedded image in KB")
+    parser.add_argument("--repeat", type=int, default=20, help="Number of timed runs")
+    args = parser.parse_args()
+
+    paper = build_paper(args.questions, args.images, args.image_kb)
+    if legacy_preprocess(paper) != preprocess_markdown(paper):
+        print("❌ Single-pass output differs from the legacy preprocessor")
+        return 1
+
+    print(f"📄 Paper: {args.questions} questions, {args.images} images, {len(paper) / 1024:.0f} KB")
+    results = {}
+    for name, func in (("legacy", legacy_preprocess), ("single-pass", preprocess_markdown)):
+        best = min(timeit.repeat(lambda: func(paper), number=1, repeat=args.repeat))
+        results[name] = best
+        print(f"{name:>12}: {best * 1000:.2f} ms")
+    print(f"⚡ Speedup: {results['legacy'] / results['single-pass']:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Render benchmark for Pariksha
+Measures throughput, latency percentiles and peak memory of building a synthetic paper's markdown, HTML, PDF and header,
+and saves the results as JSON so runs on different versions can be compared
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import tempfile
+import argparse
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import render
+from header import HeaderGenerator
+from render import generate_html, generate_md, generate_pdf_from_markdown
+from synthetic_paper import synthetic_cells
+
+CASES = ("generate_md", "generate_html", "generate_pdf_from_markdown", "generate_header_markdown")
+
+HEADER_DATA = {
+    "school_name": "Sunrise Public School",
+    "exam_name": "Annual Examination",
+    "subject": "Science",
+    "class_grade": "Class X",
+}
+
+
+def clear_caches():
+    """Forget rendered fragments, sections and documents so every run renders from scratch"""
+    render.fragment_cache.clear()
+    render.section_cache.clear()
+    render.document_cache.clear()
+
+
+def percentile(ordered, pct):
+    """Return the pct-th percentile of sorted values, interpolating between neighbours"""
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def measure(func, repeat, warmup=1, reset=None):
+    """Time repeat runs of func after warmup runs, then take the peak of Python allocations over one more run
+
+    tracemalloc slows code down, so it is only on for the extra run. It sees Python allocations only, not memory
+    allocated inside MuPDF.
+    """
+    for _ in range(warmup):
+        if reset:
+            reset()
+        func()
+
+    times = []
+    for _ in range(repeat):
+        if reset:
+            reset()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    if reset:
+        reset()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    ordered = sorted(times)
+    return {
+        'runs': len(times),
+        'ops_per_s': round(len(times) / sum(times), 2),
+        'mean_ms': round(sum(times) / len(times) * 1000, 3),
+        'min_ms': round(ordered[0] * 1000, 3),
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+        'p90_ms': round(percentile(ordered, 90) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def run_cases(args, reset):
+    """Build the synthetic paper in the working folder and measure each case, returning paper facts and results"""
+    cells = synthetic_cells(args.questions, args.mcq, args.tables, args.headers, args.images, args.image_px, args.seed)
+    md_content = generate_md(cells, "Benchmark")
+    print(f"📄 Paper: {len(cells)} cells, {len(render.split_sections(md_content))} sections, "
+          f"{args.images} images, {len(md_content.encode('utf-8')) / 1024:.0f} KB of markdown")
+
+    header_generator = HeaderGenerator()
+    runs = {
+        'generate_md': (lambda: generate_md(cells, "Benchmark"), args.repeat),
+        'generate_html': (lambda: generate_html(md_content, "Arial", 12, 1.5, True), args.repeat),
+        'generate_pdf_from_markdown': (lambda: generate_pdf_from_markdown(md_content, "Arial", 12, 1.5, True), args.pdf_repeat),
+        'generate_header_markdown': (lambda: header_generator.generate_header_markdown("standard", HEADER_DATA), args.repeat),
+    }
+
+    cases = {}
+    for case in args.cases:
+        func, repeat = runs[case]
+        cases[case] = measure(func, repeat, reset=reset)
+        result = cases[case]
+        print(f"{case:>28}: p50 {result['p50_ms']:.3f} ms, p90 {result['p90_ms']:.3f} ms, p99 {result['p99_ms']:.3f} ms, "
+              f"{result['ops_per_s']:.1f}/s, peak {result['peak_kb']:.0f} KB")
+
+    paper = {
+        'questions': args.questions, 'mcq': args.mcq, 'tables': args.tables, 'headers': args.headers,
+        'images': args.images, 'image_px': args.image_px, 'seed': args.seed,
+        'cells': len(cells), 'md_bytes': len(md_content.encode('utf-8')),
+    }
+    return paper, cases
+
+
+def compare(results, baseline_file):
+    """Print how each case changed against a saved result file"""
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\n📊 Compared with {baseline['label']}:")
+    for case, result in results['cases'].items():
+        before = baseline['cases'].get(case)
+        if before is None:
+            continue
+        speedup = before['p50_ms'] / result['p50_ms'] if result['p50_ms'] else float('inf')
+        memory = result['peak_kb'] / before['peak_kb'] if before['peak_kb'] else float('inf')
+        print(f"{case:>28}: p50 {speedup:.2f}x faster, peak memory {memory:.2f}x")
+
+
+def main():
+    """Run the render benchmark"""
+    parser = argparse.ArgumentParser(description="Pariksha render benchmark")
+    parser.add_argument("--questions", type=int, default=100, help="Number of questions")
+    parser.add_argument("--mcq", type=float, default=0.5, help="Fraction of questions with a)-d) options")
+    parser.add_argument("--tables", type=int, default=5, help="Number of tables")
+    parser.add_argument("--headers", type=int, default=4, help="Number of centered section headers, each on a new page")
+    parser.add_argument("--images", type=int, default=5, help="Number of embedded images")
+    parser.add_argument("--image-px", type=int, default=400, help="Width and height of each image in pixels")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic paper")
+    parser.add_argument("--repeat", type=int, default=50, help="Timed runs of the markdown, HTML and header cases")
+    parser.add_argument("--pdf-repeat", type=int, default=5, help="Timed runs of the PDF case")
+    parser.add_argument("--warm", action="store_true", help="Keep the render caches between runs instead of rendering from scratch")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES), help="Cases to run")
+    parser.add_argument("--label", default=datetime.now().strftime("%Y%m%d-%H%M%S"), help="Name of this run, e.g. a version")
+    parser.add_argument("--output", "-o", help="Result file (default: benchmark_results/<label>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare with")
+    args = parser.parse_args()
+
+    output_file = os.path.abspath(args.output or os.path.join("benchmark_results", f"{args.label}.json"))
+    baseline_file = os.path.abspath(args.compare) if args.compare else None
+    reset = None if args.warm else clear_caches
+
+    # Images are rendered from assets/ in the working folder, so run where the synthetic paper's assets are
+    start_dir = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="pariksha-bench-") as workdir:
+        os.chdir(workdir)
+        try:
+            paper, cases = run_cases(args, reset)
+        finally:
+            # Windows cannot delete the working folder
+            os.chdir(start_dir)
+
+    results = {
+        'label': args.label,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'paper': paper,
+        'warm': args.warm,
+        'cases': cases,
+    }
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=4)
+    print(f"✅ Results saved to {output_file}")
+
+    if baseline_file:
+        compare(results, baseline_file)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for Pariksha
+Measures how long the modules imported by app.py take to load, broken down by package, checks the total
+against a startup budget and checks that the PDF and markdown libraries are left until a render needs them
+"""
+
+import os
+import re
+import ast
+import sys
+import argparse
+import statistics
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on the first preview or PDF, never when the editor opens
+DEFERRED_MODULES = ("fitz", "pymupdf", "markdown_pdf", "markdown")
+
+# "import time:  self [us] | cumulative | imported package", nested imports indented under the package
+IMPORTTIME_PATTERN = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+
+
+def app_imports(app_file):
+    """Return the modules app.py imports at the top level"""
+    with open(app_file, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modules.append(node.module)
+    return modules
+
+
+def measure_imports(modules):
+    """Import modules in a fresh interpreter and return (module, self seconds) for everything that was loaded"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "; ".join(f"import {module}" for module in modules)],
+        cwd=ROOT_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    loaded = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if match:
+            loaded.append((match.group(4), int(match.group(1)) / 1_000_000))
+    return loaded
+
+
+def breakdown(loaded):
+    """Sum import time by top-level package"""
+    packages = {}
+    for module, seconds in loaded:
+        package = module.split('.')[0]
+        packages[package] = packages.get(package, 0.0) + seconds
+    return packages
+
+
+def main():
+    """Run the startup benchmark"""
+    parser = argparse.ArgumentParser(description="Pariksha startup benchmark")
+    parser.add_argument("--budget-ms", type=float, default=1500, help="Most the app's imports may take, in ms")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of fresh interpreters to time; the median is reported")
+    parser.add_argument("--top", type=int, default=15, help="Number of packages to list")
+    args = parser.parse_args()
+
+    modules = app_imports(os.path.join(ROOT_DIR, "app.py"))
+    # The first run may compile .pyc files, which an installed app has already done
+    measure_imports(modules)
+    runs = [measure_imports(modules) for _ in range(args.repeat)]
+    totals = [sum(seconds for _, seconds in loaded) for loaded in runs]
+    median_run = runs[totals.index(sorted(totals)[len(totals) // 2])]
+    packages = breakdown(median_run)
+    total = sum(packages.values())
+
+    print(f"📦 Imports of app.py: {', '.join(modules)}")
+    print(f"{'package':>24}  {'ms':>8}  {'share':>6}")
+    for package, seconds in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{package:>24}  {seconds * 1000:8.1f}  {seconds / total:6.1%}")
+    print(f"{'total':>24}  {total * 1000:8.1f}  (median of {args.repeat}, spread {statistics.pstdev(totals) * 1000:.1f} ms)")
+
+    failed = False
+    eager = [module for module in DEFERRED_MODULES if module in packages]
+    if eager:
+        print(f"❌ Loaded at startup but only needed for rendering: {', '.join(eager)}")
+        failed = True
+    if total * 1000 > args.budget_ms:
+        print(f"❌ Startup imports take {total * 1000:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if not failed:
+        print(f"✅ Startup imports within the {args.budget_ms:.0f} ms budget")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Synthetic question papers for Pariksha benchmarks
+Builds papers in the metadata/*.json format with a chosen mix of questions, options, tables, headers and images
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assets import ASSETS_DIR, asset_markdown, store_asset
+from paper import Cell, paper_metadata
+from storage import atomic_write
+
+WORDS = (
+    "calculate the value area triangle circle speed distance energy force cell plant reaction acid "
+    "describe explain why how which following statement correct given figure table temperature"
+).split()
+
+
+def build_image(size_px, rng):
+    """Build a noisy PNG that does not compress away, like a photographed diagram"""
+    import fitz
+
+    samples = rng.randbytes(size_px * size_px * 3)
+    pixmap = fitz.Pixmap(fitz.csRGB, size_px, size_px, samples, False)
+    return pixmap.tobytes("png")
+
+
+def sentence(rng, words=12):
+    """Return a sentence of random words"""
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def table_markdown(rng, rows, cols):
+    """Return a markdown table of random values"""
+    lines = ["| " + " | ".join(f"Column {col + 1}" for col in range(cols)) + " |",
+             "|" + "---|" * cols]
+    for _ in range(rows):
+        lines.append("| " + " | ".join(str(rng.randint(1, 999)) for _ in range(cols)) + " |")
+    return "\n".join(lines)
+
+
+def synthetic_cells(questions=50, mcq=0.5, tables=5, headers=3, images=5, image_px=400, seed=0, assets_dir=ASSETS_DIR):
+    """Build the cells of a synthetic paper
+
+    mcq is the fraction of questions followed by an a)-d) option block. tables and images are spread evenly
+    over the questions; each of the headers starts a centered section, after a page break from the second on.
+    Images are stored in assets_dir, so renders must run from its parent folder.
+    """
+    rng = random.Random(seed)
+    cells = [Cell(code="# SCHOOL NAME\n## Annual Examination\n**Subject:** Science", question_num=0, center=True)]
+
+    def spread(count):
+        return {round(i * questions / count) + 1 for i in range(count)} if count else set()
+
+    header_at, table_at, image_at = spread(headers), spread(tables), spread(images)
+    for q in range(1, questions + 1):
+        if q in header_at:
+            if len(cells) > 1:
+                cells.append(Cell(cell_type="pagebreak", code="📄 Page Break"))
+            section = chr(ord('A') + len([c for c in cells if c.center]) - 1)
+            cells.append(Cell(code=f"## SECTION {section}", question_num=0, center=True))
+
+        text = sentence(rng) + "?"
+        if rng.random() < mcq:
+            text += "\n\n" + "\n".join(f"{letter}) {sentence(rng, 4)}" for letter in "abcd")
+        if q in table_at:
+            text += "\n\n" + table_markdown(rng, 4, 3)
+        if q in image_at:
+            image_name = store_asset(build_image(image_px, rng), "png", assets_dir)
+            text += "\n\n" + asset_markdown(image_name, f"Figure {q}")
+        cells.append(Cell(code=text, question_num=q, marks=rng.choice((1, 2, 3, 5))))
+
+    cells.append(Cell(cell_type="end", code="🏁 ----End of Paper ----"))
+    return cells
+
+
+def synthetic_paper(questions=50, mcq=0.5, tables=5, headers=3, images=5, image_px=400, seed=0, assets_dir=ASSETS_DIR):
+    """Build the metadata dictionary of a synthetic paper, as saved in metadata/"""
+    cells = synthetic_cells(questions, mcq, tables, headers, images, image_px, seed, assets_dir)
+    return paper_metadata(cells, "Arial", 12, 1.5, True, "Beginning")
+
+
+def main():
+    """Write a synthetic paper to the metadata folder"""
+    parser = argparse.ArgumentParser(description="Pariksha synthetic paper generator")
+    parser.add_argument("name", help="Paper name")
+    parser.add_argument("--questions", type=int, default=50, help="Number of questions")
+    parser.add_argument("--mcq", type=float, default=0.5, help="Fraction of questions with a)-d) options")
+    parser.add_argument("--tables", type=int, default=5, help="Number of tables")
+    parser.add_argument("--headers", type=int, default=3, help="Number of centered section headers")
+    parser.add_argument("--images", type=int, default=5, help="Number of embedded images")
+    parser.add_argument("--image-px", type=int, default=400, help="Width and height of each image in pixels")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed; the same seed builds the same paper")
+    parser.add_argument("--metadata-dir", "-m", default="metadata", help="Directory of saved paper metadata")
+    args = parser.parse_args()
+
+    data = synthetic_paper(args.questions, args.mcq, args.tables, args.headers, args.images, args.image_px, args.seed)
+    metadata_path = os.path.join(args.metadata_dir, f"{args.name}.json")
+    atomic_write(metadata_path, json.dumps(data, indent=4, ensure_ascii=False))
+    print(f"✅ Wrote {metadata_path} ({len(data['cells'])} cells)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
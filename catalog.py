@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Paper catalog for Pariksha - Question Paper Drafting System
+Keeps a SQLite index of saved papers so they can be listed and searched without reading metadata/
+"""
+
+import os
+import re
+import sqlite3
+import argparse
+from contextlib import closing
+from pathlib import Path
+
+from storage import metadata_stat, read_metadata
+
+CATALOG_PATH = "catalog.db"
+
+# "Subject: Mathematics" as written by the header generator, with or without bold markup
+SUBJECT_PATTERN = re.compile(r'Subject:\s*(?:</strong>|\*\*)?\s*([^<*\n]+)')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    name TEXT PRIMARY KEY,
+    subject TEXT NOT NULL DEFAULT '',
+    modified REAL NOT NULL,
+    size INTEGER NOT NULL,
+    cell_count INTEGER NOT NULL,
+    total_marks INTEGER NOT NULL
+)
+"""
+
+
+def paper_summary(data):
+    """Return the subject, cell count and total marks of a paper's metadata"""
+    subject = data.get('subject', '')
+    if not subject:
+        for cell in data['cells']:
+            match = SUBJECT_PATTERN.search(cell.get('text', '')) if cell['type'] == 'textbox' else None
+            if match:
+                subject = match.group(1).strip()
+                break
+    total_marks = sum(cell.get('marks', 0) for cell in data['cells'] if cell['type'] == 'textbox')
+    return subject, len(data['cells']), total_marks
+
+
+class PaperCatalog:
+    """SQLite index of the papers saved in the metadata directory"""
+
+    def __init__(self, path=CATALOG_PATH, metadata_dir="metadata"):
+        self.path = path
+        self.metadata_dir = metadata_dir
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(SCHEMA)
+
+    def _connect(self):
+        """Open a connection; each call gets its own so sessions on other threads never share one"""
+        return sqlite3.connect(self.path, timeout=10)
+
+    def update(self, name, data, modified=None, size=None):
+        """Add or refresh a paper from its metadata dictionary"""
+        if modified is None or size is None:
+            modified, size = metadata_stat(Path(self.metadata_dir) / f"{name}.json")
+        subject, cell_count, total_marks = paper_summary(data)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO papers (name, subject, modified, size, cell_count, total_marks) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (name, subject, modified, size, cell_count, total_marks)
+            )
+
+    def remove(self, name):
+        """Drop a paper from the catalog"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM papers WHERE name = ?", (name,))
+
+    def sync(self):
+        """Bring the catalog up to date with the metadata directory, reading only changed files"""
+        if not os.path.isdir(self.metadata_dir):
+            return 0
+        with closing(self._connect()) as conn:
+            known = {name: (modified, size) for name, modified, size in conn.execute("SELECT name, modified, size FROM papers")}
+
+        changed = 0
+        on_disk = set()
+        with os.scandir(self.metadata_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.json') or not entry.is_file():
+                    continue
+                name = entry.name[:-5]
+                on_disk.add(name)
+                try:
+                    modified, size = metadata_stat(entry.path)
+                    if known.get(name) == (modified, size):
+                        continue
+                    self.update(name, read_metadata(entry.path), modified, size)
+                except (OSError, ValueError, KeyError):
+                    continue
+                changed += 1
+
+        for name in set(known) - on_disk:
+            self.remove(name)
+            changed += 1
+        return changed
+
+    def rebuild(self):
+        """Rebuild the catalog from scratch by reading every metadata file"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM papers")
+        return self.sync()
+
+    def search(self, query="", subject="", limit=500):
+        """Return papers whose name or subject contains query, most recently modified first"""
+        sql = "SELECT name, subject, modified, cell_count, total_marks FROM papers WHERE (name LIKE ? OR subject LIKE ?)"
+        params = [f"%{query}%", f"%{query}%"]
+        if subject:
+            sql += " AND subject = ?"
+            params.append(subject)
+        sql += " ORDER BY modified DESC LIMIT ?"
+        params.append(limit)
+        with closing(self._connect()) as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def subjects(self):
+        """Return the distinct subjects in the catalog"""
+        with closing(self._connect()) as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT subject FROM papers WHERE subject != '' ORDER BY subject")]
+
+
+def main():
+    """Main function for command line usage"""
+    parser = argparse.ArgumentParser(description="Pariksha Paper Catalog")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the catalog from metadata/")
+    parser.add_argument("--search", "-s", default="", help="Only list papers whose name or subject contains this text")
+    parser.add_argument("--catalog", default=CATALOG_PATH, help="Catalog database file")
+    parser.add_argument("--metadata-dir", "-m", default="metadata", help="Directory of saved paper metadata")
+
+    args = parser.parse_args()
+
+    catalog = PaperCatalog(args.catalog, args.metadata_dir)
+    changed = catalog.rebuild() if args.rebuild else catalog.sync()
+    print(f"✅ Catalog updated ({changed} change(s))")
+    for name, subject, modified, cell_count, total_marks in catalog.search(args.search):
+        print(f"{name:<40} {subject:<20} {cell_count:>4} cells {total_marks:>4} marks")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Font registry for Pariksha - Question Paper Drafting System
+Finds font files for the paper's font and for Indic scripts used in it, loading each file once per process
+"""
+
+import os
+import re
+import threading
+from functools import lru_cache
+
+# Fonts shipped with or added to the app; searched before the system font folders
+FONTS_DIR = "fonts"
+
+SYSTEM_FONT_DIRS = (
+    os.path.join(os.environ.get("WINDIR", r"C:\Windows"), "Fonts"),
+    os.path.join(os.environ.get("LOCALAPPDATA", ""), "Microsoft", "Windows", "Fonts"),
+    "/usr/share/fonts",
+    "/usr/local/share/fonts",
+    os.path.expanduser("~/.fonts"),
+    os.path.expanduser("~/.local/share/fonts"),
+    "/Library/Fonts",
+    "/System/Library/Fonts",
+    os.path.expanduser("~/Library/Fonts"),
+)
+
+# Candidate file names of each family as (regular, bold); the first one found wins
+FONT_FILES = {
+    "Arial": (("arial.ttf", "Arial.ttf", "LiberationSans-Regular.ttf"),
+              ("arialbd.ttf", "Arial Bold.ttf", "LiberationSans-Bold.ttf")),
+    "Times New Roman": (("times.ttf", "Times New Roman.ttf", "LiberationSerif-Regular.ttf"),
+                        ("timesbd.ttf", "Times New Roman Bold.ttf", "LiberationSerif-Bold.ttf")),
+    "Courier New": (("cour.ttf", "Courier New.ttf", "LiberationMono-Regular.ttf"),
+                    ("courbd.ttf", "Courier New Bold.ttf", "LiberationMono-Bold.ttf")),
+    "Verdana": (("verdana.ttf", "Verdana.ttf", "DejaVuSans.ttf"),
+                ("verdanab.ttf", "Verdana Bold.ttf", "DejaVuSans-Bold.ttf")),
+}
+
+# Unicode block of each script and the Noto family used to print it
+SCRIPTS = {
+    "devanagari": ("\u0900-\u097f", "Noto Sans Devanagari"),
+    "bengali": ("\u0980-\u09ff", "Noto Sans Bengali"),
+    "gurmukhi": ("\u0a00-\u0a7f", "Noto Sans Gurmukhi"),
+    "gujarati": ("\u0a80-\u0aff", "Noto Sans Gujarati"),
+    "oriya": ("\u0b00-\u0b7f", "Noto Sans Oriya"),
+    "tamil": ("\u0b80-\u0bff", "Noto Sans Tamil"),
+    "telugu": ("\u0c00-\u0c7f", "Noto Sans Telugu"),
+    "kannada": ("\u0c80-\u0cff", "Noto Sans Kannada"),
+    "malayalam": ("\u0d00-\u0d7f", "Noto Sans Malayalam"),
+}
+
+
+def _noto_files(family):
+    """Return the file names Noto fonts of a family are distributed under"""
+    stem = family.replace(" ", "")
+    return (f"{stem}-Regular.ttf", f"{stem}-Regular.otf"), (f"{stem}-Bold.ttf", f"{stem}-Bold.otf")
+
+
+FONT_FILES.update({family: _noto_files(family) for _, family in SCRIPTS.values()})
+
+# Words of one script, with the spaces between them, on a single line; zero-width (non-)joiners shape conjuncts
+SCRIPT_RUN_PATTERNS = {
+    script: re.compile(f"[{script_range}\u200c\u200d]+(?:[ \\t]+[{script_range}\u200c\u200d]+)*")
+    for script, (script_range, _) in SCRIPTS.items()
+}
+
+# Fonts are served to the PDF engine from memory under this folder name
+ARCHIVE_PREFIX = "pariksha-fonts"
+
+
+def scripts_in(text):
+    """Return the scripts of SCRIPTS that appear in text"""
+    return {script for script, pattern in SCRIPT_RUN_PATTERNS.items() if pattern.search(text)}
+
+
+def script_class(script):
+    """Return the CSS class that sets a script's font"""
+    return f"script-{script}"
+
+
+def wrap_scripts(md_content, scripts):
+    """Wrap runs of each script in a span so they are set in that script's font"""
+    for script in scripts:
+        md_content = SCRIPT_RUN_PATTERNS[script].sub(
+            lambda match, script=script: f'<span class="{script_class(script)}">{match.group(0)}</span>', md_content
+        )
+    return md_content
+
+
+def prepare_fonts(md_content, font_style):
+    """Return md_content with script runs wrapped for their fonts, and the font files it needs"""
+    faces = font_registry.faces(font_style, md_content)
+    registered = {family for family, _, _ in faces}
+    scripts = [script for script in scripts_in(md_content) if SCRIPTS[script][1] in registered]
+    return wrap_scripts(md_content, scripts), faces
+
+
+class FontRegistry:
+    """Font files on this machine, indexed on first use and read into memory once each"""
+
+    def __init__(self, font_dirs=None):
+        self.font_dirs = font_dirs or (FONTS_DIR,) + SYSTEM_FONT_DIRS
+        self._index = None
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def _files(self):
+        """Map lower-case font file names to paths, scanning the font folders on first use"""
+        with self._lock:
+            if self._index is None:
+                index = {}
+                for font_dir in self.font_dirs:
+                    for root, _, files in os.walk(font_dir):
+                        for name in files:
+                            index.setdefault(name.lower(), os.path.join(root, name))
+                self._index = index
+            return self._index
+
+    def find(self, family, bold=False):
+        """Return the path of a family's regular or bold font file, or None"""
+        files = self._files()
+        for name in FONT_FILES.get(family, ((), ()))[1 if bold else 0]:
+            path = files.get(name.lower())
+            if path:
+                return path
+        return None
+
+    def load(self, path):
+        """Return the bytes of a font file, reading it only the first time"""
+        with self._lock:
+            data = self._buffers.get(path)
+        if data is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+            with self._lock:
+                data = self._buffers.setdefault(path, data)
+        return data
+
+    def faces(self, font_style, text):
+        """Return (family, bold, path) of the font files needed for text set in font_style"""
+        families = [font_style] + [SCRIPTS[script][1] for script in sorted(scripts_in(text))]
+        return tuple(
+            (family, bold, path)
+            for family in families
+            for bold in (False, True)
+            for path in [self.find(family, bold)] if path
+        )
+
+    def rescan(self):
+        """Forget the index so fonts installed since the first scan are found"""
+        with self._lock:
+            self._index = None
+
+
+@lru_cache(maxsize=64)
+def font_face_css(faces):
+    """Build the @font-face rules for font files and the classes that select each script's font"""
+    rules = []
+    for family, bold, path in faces:
+        rules.append(
+            f'@font-face {{ font-family: "{family}"; font-weight: {"bold" if bold else "normal"}; '
+            f'src: url("{ARCHIVE_PREFIX}/{os.path.basename(path)}"); }}'
+        )
+    registered = {family for family, _, _ in faces}
+    for script, (_, family) in SCRIPTS.items():
+        if family in registered:
+            rules.append(f'.{script_class(script)} {{ font-family: "{family}"; }}')
+    return "\n".join(rules)
+
+
+@lru_cache(maxsize=16)
+def font_archive(faces, root="."):
+    """Return a PyMuPDF archive of root plus the font files, for resolving @font-face and image paths"""
+    import fitz
+
+    archive = fitz.Archive(root)
+    for _, _, path in faces:
+        archive.add(font_registry.load(path), f"{ARCHIVE_PREFIX}/{os.path.basename(path)}")
+    return archive
+
+
+# One per process; each render worker builds its own on first use
+font_registry = FontRegistry()
@@ -5,75 +5,167 @@ Provides functionality to create, manage, and format headers for question papers
 """
 
 import os
+import csv
 import sys
 import json
 import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
+from types import MappingProxyType
+
+from storage import safe_filename
+
+# Manifests with at least this many rows are rendered on several processes; a header takes a few microseconds,
+# so smaller manifests are done before the worker processes would have started
+PARALLEL_MIN_ROWS = 50000
+
+
+def freeze_template(template):
+    """Return a read-only copy of a template, with its instructions as a tuple"""
+    return MappingProxyType({
+        key: tuple(value) if isinstance(value, list) else value for key, value in template.items()
+    })
+
+
+def thaw_template(template):
+    """Return an editable, JSON-serializable copy of a template"""
+    return {key: list(value) if isinstance(value, tuple) else value for key, value in template.items()}
+
+
+# Built-in templates, read-only so they can be shared by every generator and thread
+DEFAULT_TEMPLATES = MappingProxyType({name: freeze_template(template) for name, template in {
+    "standard": {
+        "school_name": "SCHOOL NAME",
+        "exam_name": "EXAMINATION NAME",
+        "subject": "SUBJECT",
+        "class_grade": "CLASS/GRADE",
+        "duration": "3 Hours",
+        "max_marks": "100",
+        "date": "",
+        "instructions": [
+            "All questions are compulsory.",
+            "Write your answers in the space provided.",
+            "Use black or blue pen only.",
+            "Read all questions carefully before answering."
+        ]
+    },
+    "university": {
+        "university_name": "UNIVERSITY NAME",
+        "department": "DEPARTMENT",
+        "course_code": "COURSE CODE",
+        "course_title": "COURSE TITLE",
+        "semester": "SEMESTER",
+        "year": "YEAR",
+        "duration": "3 Hours",
+        "max_marks": "100",
+        "date": "",
+        "instructions": [
+            "Answer ALL questions.",
+            "All questions carry equal marks unless specified.",
+            "Use of calculator is permitted/not permitted.",
+            "Start each answer on a new page."
+        ]
+    },
+    "board": {
+        "board_name": "BOARD OF EDUCATION",
+        "examination": "EXAMINATION",
+        "subject": "SUBJECT",
+        "class_standard": "CLASS/STANDARD",
+        "paper_code": "PAPER CODE",
+        "duration": "3 Hours",
+        "max_marks": "100",
+        "date": "",
+        "roll_number_section": True,
+        "instructions": [
+            "This question paper contains X questions.",
+            "All questions are compulsory.",
+            "Marks are indicated against each question.",
+            "Write your Roll Number in the space provided above."
+        ]
+    }
+}.items()})
+
+
+class TemplateRegistry:
+    """Custom header templates in a folder, each read once and re-read only after its file changes
+
+    Templates are returned read-only and may be shared between threads; customize a copy, e.g. thaw_template().
+    """
+
+    def __init__(self, templates_dir="templates"):
+        self.templates_dir = Path(templates_dir)
+        self._templates = {}
+        self._names = None
+        self._lock = threading.Lock()
+
+    def load(self, template_name):
+        """Return a template, reading its file only if it changed since it was last read"""
+        template_file = self.templates_dir / f"{template_name}.json"
+        try:
+            stat = template_file.stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Template '{template_name}' not found in {self.templates_dir}") from None
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._templates.get(template_name)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+        with open(template_file, 'r', encoding='utf-8') as f:
+            template = freeze_template(json.load(f))
+        with self._lock:
+            self._templates[template_name] = (version, template)
+        return template
+
+    def names(self):
+        """Return the names of the templates in the folder, listing it again only after a file is added or removed"""
+        try:
+            version = self.templates_dir.stat().st_mtime_ns
+        except FileNotFoundError:
+            return []
+        with self._lock:
+            if self._names is not None and self._names[0] == version:
+                return list(self._names[1])
+        names = tuple(sorted(path.stem for path in self.templates_dir.glob("*.json")))
+        with self._lock:
+            self._names = (version, names)
+        return list(names)
+
+    def save(self, template_name, template_data):
+        """Write a template to the folder and return its file"""
+        self.templates_dir.mkdir(exist_ok=True)
+        template_file = self.templates_dir / f"{template_name}.json"
+        with open(template_file, 'w', encoding='utf-8') as f:
+            json.dump(thaw_template(template_data), f, indent=4, ensure_ascii=False)
+        return str(template_file)
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def template_registry(templates_dir="templates"):
+    """Return the shared registry of a templates folder"""
+    key = os.path.abspath(templates_dir)
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = _registries[key] = TemplateRegistry(templates_dir)
+        return registry
 
 
 class HeaderGenerator:
     """Class to generate and manage question paper headers"""
 
     def __init__(self):
-        self.default_templates = {
-            "standard": {
-                "school_name": "SCHOOL NAME",
-                "exam_name": "EXAMINATION NAME",
-                "subject": "SUBJECT",
-                "class_grade": "CLASS/GRADE",
-                "duration": "3 Hours",
-                "max_marks": "100",
-                "date": "",
-                "instructions": [
-                    "All questions are compulsory.",
-                    "Write your answers in the space provided.",
-                    "Use black or blue pen only.",
-                    "Read all questions carefully before answering."
-                ]
-            },
-            "university": {
-                "university_name": "UNIVERSITY NAME",
-                "department": "DEPARTMENT",
-                "course_code": "COURSE CODE",
-                "course_title": "COURSE TITLE",
-                "semester": "SEMESTER",
-                "year": "YEAR",
-                "duration": "3 Hours",
-                "max_marks": "100",
-                "date": "",
-                "instructions": [
-                    "Answer ALL questions.",
-                    "All questions carry equal marks unless specified.",
-                    "Use of calculator is permitted/not permitted.",
-                    "Start each answer on a new page."
-                ]
-            },
-            "board": {
-                "board_name": "BOARD OF EDUCATION",
-                "examination": "EXAMINATION",
-                "subject": "SUBJECT",
-                "class_standard": "CLASS/STANDARD",
-                "paper_code": "PAPER CODE",
-                "duration": "3 Hours",
-                "max_marks": "100",
-                "date": "",
-                "roll_number_section": True,
-                "instructions": [
-                    "This question paper contains X questions.",
-                    "All questions are compulsory.",
-                    "Marks are indicated against each question.",
-                    "Write your Roll Number in the space provided above."
-                ]
-            }
-        }
+        # Shared and read-only; customizing a template always works on a copy
+        self.default_templates = DEFAULT_TEMPLATES
 
     def generate_header_markdown(self, template_type="standard", custom_data=None):
         """Generate header in markdown format"""
-        template = self.default_templates.get(template_type, self.default_templates["standard"])
-
-        if custom_data:
-            template.update(custom_data)
+        # Customize a copy, so one header's values never leak into the next
+        template = {**self.default_templates.get(template_type, self.default_templates["standard"]), **(custom_data or {})}
 
         # Set default date if not provided
         if not template.get("date"):
@@ -208,35 +300,15 @@ class HeaderGenerator:
 
     def save_template(self, template_name, template_data, templates_dir="templates"):
         """Save custom template to file"""
-        # Create templates directory if it doesn't exist
-        Path(templates_dir).mkdir(exist_ok=True)
-
-        template_file = Path(templates_dir) / f"{template_name}.json"
-
-        with open(template_file, 'w', encoding='utf-8') as f:
-            json.dump(template_data, f, indent=4, ensure_ascii=False)
-
-        return str(template_file)
+        return template_registry(templates_dir).save(template_name, template_data)
 
     def load_template(self, template_name, templates_dir="templates"):
-        """Load custom template from file"""
-        template_file = Path(templates_dir) / f"{template_name}.json"
-
-        if not template_file.exists():
-            raise FileNotFoundError(f"Template '{template_name}' not found in {templates_dir}")
-
-        with open(template_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        """Load custom template from file, read-only and cached until the file changes"""
+        return template_registry(templates_dir).load(template_name)
 
     def list_templates(self, templates_dir="templates"):
         """List available custom templates"""
-        templates_path = Path(templates_dir)
-
-        if not templates_path.exists():
-            return []
-
-        template_files = list(templates_path.glob("*.json"))
-        return [f.stem for f in template_files]
+        return template_registry(templates_dir).names()
 
     def create_interactive_header(self):
         """Interactive CLI for creating headers"""
@@ -305,6 +377,88 @@ class HeaderGenerator:
         return output_file
 
 
+def read_manifest(manifest_path):
+    """Read header rows from a CSV manifest (one column per field) or a JSONL manifest (one JSON object per line)
+
+    In CSV, instructions are separated by "|" and empty cells keep the template's value.
+    """
+    manifest_path = Path(manifest_path)
+    rows = []
+    if manifest_path.suffix.lower() == ".jsonl":
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    rows.append(json.loads(line))
+        return rows
+
+    # utf-8-sig reads manifests saved from Excel, which start with a byte order mark
+    with open(manifest_path, 'r', encoding='utf-8-sig', newline='') as f:
+        for record in csv.DictReader(f):
+            row = {key.strip(): value.strip() for key, value in record.items()
+                   if key and isinstance(value, str) and value.strip()}
+            if 'instructions' in row:
+                row['instructions'] = [item.strip() for item in row['instructions'].split('|') if item.strip()]
+            if 'roll_number_section' in row:
+                row['roll_number_section'] = row['roll_number_section'].lower() not in ("no", "false", "0")
+            rows.append(row)
+    return rows
+
+
+def render_headers(rows, template_type="standard", date=None, start=0):
+    """Render manifest rows to (name, markdown) pairs
+
+    A row's 'template' column picks its template type and 'name' its file name. The generator and the date are
+    set up once for all rows, and each row is laid over a copy of its template so rows never affect each other.
+    """
+    generator = HeaderGenerator()
+    date = date or datetime.now().strftime("%B %d, %Y")
+    headers = []
+    for index, row in enumerate(rows, start + 1):
+        row = dict(row)
+        row_template = row.pop('template', None) or template_type
+        name = row.pop('name', None) or f"header_{index:04d}_{row_template}"
+        data = {**generator.default_templates.get(row_template, generator.default_templates["standard"]), **row}
+        if not data.get("date"):
+            data["date"] = date
+        headers.append((name, generator._build_markdown_header(data, row_template)))
+    return headers
+
+
+def batch_generate(manifest_path, output_dir="headers", template_type="standard", workers=None):
+    """Render every header in a manifest and write each to its own markdown file, returning the files written"""
+    rows = read_manifest(manifest_path)
+    date = datetime.now().strftime("%B %d, %Y")
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(rows) >= PARALLEL_MIN_ROWS:
+        chunk_size = -(-len(rows) // workers)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(render_headers, rows[start:start + chunk_size], template_type, date, start)
+                for start in range(0, len(rows), chunk_size)
+            ]
+            headers = [header for future in futures for header in future.result()]
+    else:
+        headers = render_headers(rows, template_type, date)
+
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    written = []
+    used_names = set()
+    for name, header_markdown in headers:
+        stem = safe_filename(name, "header")
+        # Rows with the same name get numbered files rather than overwriting each other
+        unique_stem, copy = stem, 1
+        while unique_stem.lower() in used_names:
+            copy += 1
+            unique_stem = f"{stem}_{copy}"
+        used_names.add(unique_stem.lower())
+        output_file = Path(output_dir) / f"{unique_stem}.md"
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(header_markdown)
+        written.append(str(output_file))
+    return written
+
+
 def main():
     """Main function for command line usage"""
     parser = argparse.ArgumentParser(description="Pariksha Header Generator")
@@ -314,9 +468,17 @@ def main():
                        help="Run in interactive mode")
     parser.add_argument("--output", "-o", help="Output file name")
     parser.add_argument("--config", "-c", help="JSON configuration file")
+    parser.add_argument("--batch", "-b", help="CSV or JSONL manifest with one header per row")
+    parser.add_argument("--output-dir", default="headers", help="Directory for headers generated with --batch")
+    parser.add_argument("--workers", "-w", type=int, help="Number of processes for very large manifests")
 
     args = parser.parse_args()
 
+    if args.batch:
+        written = batch_generate(args.batch, args.output_dir, args.template, args.workers)
+        print(f"✅ {len(written)} header(s) generated in: {args.output_dir}")
+        return
+
     generator = HeaderGenerator()
 
     if args.interactive:
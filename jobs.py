@@ -0,0 +1,227 @@
+"""
+Background PDF rendering for Pariksha - Question Paper Drafting System
+Renders paper sections on a process pool shared by all Streamlit sessions
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import CancelledError
+
+import render
+from profiles import DEFAULT_PROFILE, print_profile
+from tracing import RenderTrace
+
+
+class RenderJob:
+    """A PDF render in progress on the worker pool"""
+
+    def __init__(self, job_id, section_keys, trace=None):
+        self.id = job_id
+        self.section_keys = section_keys
+        self.sections = [None] * len(section_keys)
+        self.futures = {}
+        self.owners = set()
+        self.status = "running"
+        self.error = None
+        self.pdf_bytes = None
+        self.stitching = False
+        self.trace = trace or RenderTrace('pdf')
+        self.finished = threading.Event()
+
+    @property
+    def done_sections(self):
+        """Number of sections rendered so far"""
+        return sum(1 for section in self.sections if section is not None)
+
+    @property
+    def progress(self):
+        """Fraction of sections rendered so far"""
+        if not self.sections:
+            return 1.0
+        return self.done_sections / len(self.sections)
+
+    def wait(self, timeout=None):
+        """Block until the job is done, failed or cancelled, and return its status"""
+        self.finished.wait(timeout)
+        return self.status
+
+
+class RenderJobManager:
+    """Submit, track, de-duplicate and cancel PDF renders"""
+
+    def __init__(self, max_workers=None, max_jobs=32):
+        self.max_workers = max_workers or int(os.environ.get("PARIKSHA_RENDER_WORKERS", 0)) or min(4, os.cpu_count() or 1)
+        self.max_jobs = max_jobs
+        self._executor = None
+        self._jobs = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        """Return the worker pool, starting it on first use"""
+        if self._executor is None:
+            # Imported here so multiprocessing is only loaded once a PDF is requested
+            from concurrent.futures import ProcessPoolExecutor
+
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def submit(self, md_content, font_style, font_size, line_spacing, pagination, profile_name=DEFAULT_PROFILE, owner=None, trace=None):
+        """Queue a PDF render and return its job, reusing an identical job that is running or done
+
+        trace, if given, collects the time each section spent in each render stage and is logged when the PDF is done.
+        """
+        profile = print_profile(profile_name, font_style, font_size, line_spacing)
+        sections = render.split_sections(md_content)
+        section_keys = [render.section_key(section_md, profile) for section_md in sections]
+        job_id = render.document_key(section_keys)
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.status in ("running", "done"):
+                job.owners.add(owner)
+                self._jobs.move_to_end(job_id)
+                return job
+
+            job = RenderJob(job_id, section_keys, trace)
+            job.owners.add(owner)
+            self._jobs[job_id] = job
+            self._prune()
+
+            for index, (key, section_md) in enumerate(zip(section_keys, sections)):
+                cached = render.section_cache.get(key)
+                if cached is not None:
+                    job.sections[index] = cached
+                    continue
+                job.trace.attrs['rendered_sections'] = job.trace.attrs.get('rendered_sections', 0) + 1
+                # Sections shared with another running job are rendered only once
+                future = self._inflight.get(key)
+                if future is None:
+                    future = self._pool().submit(render.traced_section_pdf, section_md, profile)
+                    self._inflight[key] = future
+                job.futures[index] = future
+
+        if not job.futures:
+            self._finish(job)
+        for index, future in list(job.futures.items()):
+            future.add_done_callback(lambda future, job=job, index=index: self._section_done(job, index, future))
+        return job
+
+    def warm_up(self):
+        """Start the workers and load the render libraries in them, and the preview's in this process, without waiting"""
+        with self._lock:
+            pool = self._pool()
+            # Each worker picks up one warm-up render; none of them are cached or tracked as jobs
+            for _ in range(self.max_workers):
+                pool.submit(render.warm_up)
+        # PyMuPDF is only used on the workers, so this process loads just what the preview needs
+        threading.Thread(target=render.warm_up_preview, name="pariksha-warm-up", daemon=True).start()
+
+    def get(self, job_id):
+        """Return the job with the given id, or None"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id, owner=None):
+        """Withdraw owner from a job, cancelling its pending sections once nobody is waiting for it"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != "running":
+                return
+            job.owners.discard(owner)
+            if job.owners:
+                return
+            job.status = "cancelled"
+            job.finished.set()
+            futures = list(job.futures.values())
+        for future in futures:
+            # Sections still needed by another running job keep rendering
+            if not any(future in other.futures.values() for other in self._running_jobs()):
+                future.cancel()
+
+    def _running_jobs(self):
+        """Return the jobs that are still running"""
+        with self._lock:
+            return [job for job in self._jobs.values() if job.status == "running"]
+
+    def _section_done(self, job, index, future):
+        """Record a finished section and stitch the PDF once every section is in"""
+        key = job.section_keys[index]
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        try:
+            pdf_bytes, stages, memory, peak, attrs = future.result()
+        except CancelledError:
+            return
+        except Exception as e:
+            self._fail(job, e)
+            return
+
+        render.section_cache.put(key, pdf_bytes)
+        job.trace.merge(stages, memory, peak, attrs)
+        with self._lock:
+            job.sections[index] = pdf_bytes
+            complete = job.status == "running" and not job.stitching and all(section is not None for section in job.sections)
+            if complete:
+                job.stitching = True
+        if complete:
+            self._finish(job)
+
+    def _finish(self, job):
+        """Stitch the rendered sections into the final PDF on a worker, reusing the PDF of an unchanged paper"""
+        key = render.document_key(job.section_keys)
+        pdf_bytes = render.document_cache.get(key)
+        if pdf_bytes is not None:
+            self._done(job, pdf_bytes)
+            return
+        try:
+            with self._lock:
+                future = self._pool().submit(render.traced_document_pdf, job.sections)
+        except Exception as e:
+            self._fail(job, e)
+            return
+        future.add_done_callback(lambda future, job=job, key=key: self._document_done(job, key, future))
+
+    def _document_done(self, job, key, future):
+        """Record the stitched PDF of a job"""
+        try:
+            pdf_bytes, stages, memory, peak, attrs = future.result()
+        except Exception as e:
+            self._fail(job, e)
+            return
+        render.document_cache.put(key, pdf_bytes)
+        job.trace.merge(stages, memory, peak, attrs)
+        self._done(job, pdf_bytes)
+
+    def _done(self, job, pdf_bytes):
+        """Hand the finished PDF to a job and log its trace"""
+        with self._lock:
+            job.pdf_bytes = pdf_bytes
+            if job.status == "running":
+                job.status = "done"
+            job.futures.clear()
+            job.finished.set()
+        job.trace.finish(sections=len(job.sections), pdf_bytes=len(pdf_bytes))
+
+    def _fail(self, job, error):
+        """Mark a running job failed and log its trace"""
+        with self._lock:
+            failed = job.status == "running"
+            if failed:
+                job.status = "failed"
+                job.error = str(error)
+                job.finished.set()
+        if failed:
+            job.trace.finish(error=str(error))
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond max_jobs"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.status != "running"]
+        while len(self._jobs) > self.max_jobs and finished:
+            del self._jobs[finished.pop(0)]
+
+
+# Shared by every session of the Streamlit server
+render_jobs = RenderJobManager()
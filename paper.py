@@ -0,0 +1,87 @@
+"""
+Paper model for Pariksha - Question Paper Drafting System
+Cells and conversion to and from the metadata/*.json format written by the Save button
+"""
+
+import uuid
+
+from profiles import DEFAULT_PROFILE
+from storage import read_metadata
+
+
+class Cell:
+    """One cell of a paper: a text box, a page break or the end marker"""
+
+    # Slots keep per-cell memory down for long papers held in every session
+    __slots__ = ('id', 'type', 'code', 'question_num', 'marks', 'center', 'table_rows', 'table_cols')
+
+    def __init__(self, cell_type="textbox", code="", question_num=1, marks=0, center=False, table_rows=2, table_cols=2, cell_id=None):
+        # Widget keys are built from the id, so it must not change when cells are moved, inserted or deleted
+        self.id = cell_id or uuid.uuid4().hex[:12]
+        self.type = cell_type
+        self.code = code
+        self.question_num = question_num
+        self.marks = marks
+        self.center = center
+        self.table_rows = table_rows
+        self.table_cols = table_cols
+
+
+def cells_from_metadata(data):
+    """Build cells from a paper's metadata dictionary"""
+    cells = []
+    for cell_data in data['cells']:
+        cell_type = cell_data['type']
+        if cell_type == 'textbox':
+            cell = Cell(
+                cell_type="textbox",
+                code=cell_data['text'],
+                question_num=cell_data['question_num'],
+                marks=cell_data['marks'],
+                center=cell_data['center'],
+                table_rows=cell_data['table_rows'],
+                table_cols=cell_data['table_cols']
+            )
+            cells.append(cell)
+        elif cell_type == 'pagebreak':
+            cells.append(Cell(cell_type="pagebreak", code="📄 Page Break"))
+        elif cell_type == 'end':
+            cells.append(Cell(cell_type="end", code="🏁 ----End of Paper ----"))
+    return cells
+
+
+def paper_settings(data):
+    """Return the (font_style, font_size, line_spacing, pagination, print_profile) render settings of a paper's metadata
+
+    Font settings missing from the metadata come back as None, which leaves the print profile's own settings in place.
+    """
+    return (data.get('font_style'), data.get('font_size'), data.get('line_spacing'), data.get('pagination', True),
+            data.get('print_profile', DEFAULT_PROFILE))
+
+
+def paper_metadata(cells, font_style, font_size, line_spacing, pagination, marks_position, print_profile=DEFAULT_PROFILE):
+    """Build the metadata dictionary saved for a paper"""
+    return {
+        'font_style': font_style,
+        'font_size': font_size,
+        'line_spacing': line_spacing,
+        'pagination': pagination,
+        'marks_position': marks_position,
+        'print_profile': print_profile,
+        'cells': [
+            {
+                'type': cell.type,
+                'text': cell.code,
+                'question_num': cell.question_num,
+                'marks': cell.marks,
+                'center': cell.center,
+                'table_rows': cell.table_rows,
+                'table_cols': cell.table_cols
+            } for cell in cells
+        ]
+    }
+
+
+def load_metadata(metadata_path):
+    """Read a paper's metadata JSON file, including edits still in its journal"""
+    return read_metadata(metadata_path)
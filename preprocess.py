@@ -0,0 +1,104 @@
+"""
+Markdown preprocessing for Pariksha - Question Paper Drafting System
+Shared by the HTML preview and the PDF renderer so both see identical markdown
+"""
+
+import re
+
+CENTER_DIV_OPEN = '<div style="text-align: center;">'
+CENTER_DIV_CLOSE = '</div>'
+
+# "a) text" .. "d) text" multiple choice options (matched against stripped lines)
+OPTION_PATTERN = re.compile(r'([a-d])\)\s+(.+)$')
+
+# Inline centered header: <div style="text-align: center;"># Title</div>
+# The header body may not contain '<', so the scan stops at the first tag
+CENTER_HEADER_PATTERN = re.compile(r'<div style="text-align: center;">\s*(#[^<]*)</div>')
+
+
+def _center_header_replace(match):
+    """Turn a div-wrapped header into a <center> header"""
+    return f'<center>{match.group(1).rstrip()}</center>'
+
+
+def _header_state(text, state):
+    """Track whether a div-wrapped header may still continue past the end of text"""
+    start = text.rfind(CENTER_DIV_OPEN)
+    if start != -1:
+        text = text[start + len(CENTER_DIV_OPEN):]
+        state = 'open'
+    elif state is None:
+        return None
+    if '<' in text:
+        return None
+    if state == 'open':
+        body = text.lstrip()
+        if not body:
+            return 'open'
+        return 'header' if body.startswith('#') else None
+    return 'header'
+
+
+def preprocess_markdown(md_content):
+    """Fix centered headers and alphabetical option lists in a single pass over the lines"""
+    output = []
+    inside_center_div = False
+    in_options = False
+    pending = []
+    header_state = None
+
+    def emit(line, stripped=None):
+        # Convert alphabetical options to proper markdown lists
+        nonlocal in_options
+        if stripped is None:
+            stripped = line.strip()
+        match = OPTION_PATTERN.match(stripped) if stripped[1:2] == ')' else None
+        if match:
+            if not in_options:
+                in_options = True
+                output.append('')  # Blank line so the options start a list
+            output.append(f'1. {match.group(2)}')
+        else:
+            if in_options and not stripped:
+                in_options = False
+            output.append(line)
+
+    def flush():
+        text = CENTER_HEADER_PATTERN.sub(_center_header_replace, '\n'.join(pending))
+        pending.clear()
+        for line in text.split('\n'):
+            emit(line)
+
+    def centered(line, stripped=None):
+        # Inline div-wrapped headers may span several lines, buffer until the header is closed
+        nonlocal header_state
+        header_state = _header_state(line, header_state)
+        if header_state is not None:
+            pending.append(line)
+        elif pending or CENTER_DIV_OPEN in line:
+            pending.append(line)
+            flush()
+        else:
+            emit(line, stripped)
+
+    for line in md_content.split('\n'):
+        stripped = line.strip()
+
+        if stripped == CENTER_DIV_OPEN:
+            inside_center_div = True
+        elif inside_center_div and stripped == CENTER_DIV_CLOSE:
+            inside_center_div = False
+        elif inside_center_div:
+            if stripped.startswith('#'):
+                centered(f'<center>{stripped}</center>')
+            elif stripped and not stripped.startswith('<'):
+                centered(f'{CENTER_DIV_OPEN}{stripped}</div>')
+            else:
+                centered(line, stripped)
+        else:
+            centered(line, stripped)
+
+    if pending:
+        flush()
+
+    return '\n'.join(output)
@@ -0,0 +1,50 @@
+"""
+Print profiles for Pariksha - Question Paper Drafting System
+Named page size, margin, font and heading settings shared by the preview, PDF output and batch rendering
+"""
+
+from collections import namedtuple
+
+# Heading sizes for h1-h4 as multiples of the body font size
+HEADING_SCALE = (1.8, 1.5, 1.3, 1.2)
+COMPACT_HEADING_SCALE = (1.5, 1.3, 1.15, 1.1)
+
+PrintProfile = namedtuple(
+    'PrintProfile',
+    ['name', 'paper_size', 'margin_in', 'font_style', 'font_size', 'line_spacing', 'heading_scale']
+)
+
+PRINT_PROFILES = {
+    profile.name: profile for profile in (
+        PrintProfile("A4 Classic", "A4", 0.5, "Arial", 12, 1.5, HEADING_SCALE),
+        PrintProfile("Letter", "letter", 1.0, "Arial", 12, 1.5, HEADING_SCALE),
+        PrintProfile("A4", "A4", 0.8, "Arial", 12, 1.5, HEADING_SCALE),
+        PrintProfile("A4 Compact", "A4", 0.6, "Arial", 11, 1.3, COMPACT_HEADING_SCALE),
+        PrintProfile("Legal", "legal", 1.0, "Arial", 12, 1.5, HEADING_SCALE),
+    )
+}
+
+# Papers saved before profiles existed were printed with markdown-pdf's page defaults, A4 with 36pt (0.5 inch)
+# borders, as their @page rule never reached the PDF; the same layout stays the default so they print unchanged
+DEFAULT_PROFILE = "A4 Classic"
+
+# Width of each paper size in inches
+PAPER_WIDTH_IN = {"letter": 8.5, "legal": 8.5, "A4": 210 / 25.4}
+
+
+def print_profile(name=DEFAULT_PROFILE, font_style=None, font_size=None, line_spacing=None):
+    """Return a named profile, with the paper's own font settings in place of the profile's defaults"""
+    profile = PRINT_PROFILES.get(name, PRINT_PROFILES[DEFAULT_PROFILE])
+    overrides = {'font_style': font_style, 'font_size': font_size, 'line_spacing': line_spacing}
+    return profile._replace(**{field: value for field, value in overrides.items() if value is not None})
+
+
+def page_borders(profile):
+    """Return the margins of a profile as markdown-pdf borders in points (left, top, right, bottom)"""
+    margin = round(profile.margin_in * 72)
+    return (margin, margin, -margin, -margin)
+
+
+def content_width_in(profile):
+    """Return the printable width of a profile's page between its margins, in inches"""
+    return PAPER_WIDTH_IN[profile.paper_size] - 2 * profile.margin_in
@@ -0,0 +1,512 @@
+"""
+Rendering helpers for Pariksha - Question Paper Drafting System
+Builds paper markdown from cells and renders it to HTML for the live preview and to PDF
+"""
+
+import io
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from assets import FITZ_LOCK, asset_paths, inline_assets
+from fonts import font_archive, font_face_css, prepare_fonts
+from preprocess import preprocess_markdown
+from profiles import DEFAULT_PROFILE, page_borders, print_profile
+from tracing import RenderTrace, logger, note, span
+
+
+class RenderCache:
+    """Thread-safe LRU cache of rendered output keyed by content hash"""
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for key, or None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """Store value under key, evicting the least recently used entries"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all cached entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Rendered HTML fragments shared by all sessions, keyed by the cell's markdown
+fragment_cache = RenderCache()
+
+# Rendered PDF sections shared by all sessions, keyed by stylesheet and section markdown
+section_cache = RenderCache(max_entries=128)
+
+# Finished, font-subset PDFs keyed by their sections
+document_cache = RenderCache(max_entries=16)
+
+# Markdown emitted for a page break cell; the PDF is split into sections here
+PAGE_BREAK = '<div class="page-break"></div>\n\n'
+
+_local = threading.local()
+
+
+def content_hash(text):
+    """Return a stable hash of text for use as a cache key"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def cell_markdown(cell, idx, marks_position="Beginning"):
+    """Build the markdown for a single cell"""
+    if cell.type == 'textbox':
+        question_num = cell.question_num
+        marks = cell.marks
+        text = cell.code.strip()
+
+        # Build the question content based on marks position
+        content = ""
+
+        if marks_position == "Beginning":
+            # Add marks first if specified
+            if marks > 0:
+                content += f"**[Marks: {marks}]** "
+            # Add question number if specified
+            if question_num > 0:
+                content += f"**(Q{question_num})** "
+            # Add the main text content
+            if cell.center:
+                content += f"<div style=\"text-align: center;\">\n{text}\n</div>"
+            else:
+                content += text
+        else:  # marks_position == "End"
+            # Add question number first if specified
+            if question_num > 0:
+                content += f"**(Q{question_num})** "
+            # Add the main text content
+            if cell.center:
+                content += f"<div style=\"text-align: center;\">\n{text}\n</div>"
+            else:
+                content += text
+            # Add marks at the end if specified
+            if marks > 0:
+                content += f" **[Marks: {marks}]**"
+
+        # Wrap first cell with special class to exclude from global font settings
+        if idx == 0:
+            content = f'<div class="first-cell-no-global-font">\n{content}\n</div>'
+
+        return content + "\n\n"
+
+    elif cell.type == 'pagebreak':
+        return PAGE_BREAK
+    elif cell.type == 'end':
+        return f"<div style=\"text-align: center;\">\n** End of Paper ** \n</div>"
+    return ""
+
+
+def generate_md(cells, paper_name, marks_position="Beginning"):
+    """Build the markdown for the whole paper"""
+    with span('generate_md'):
+        return "".join(cell_markdown(cell, idx, marks_position) for idx, cell in enumerate(cells))
+
+
+def _markdown_converter():
+    """Return this thread's python-markdown converter, created on first use"""
+    converter = getattr(_local, 'converter', None)
+    if converter is None:
+        import markdown
+        converter = _local.converter = markdown.Markdown(extensions=['extra'])
+    return converter
+
+
+def markdown_to_html(md_content):
+    """Preprocess markdown and convert it to an HTML fragment"""
+    with span('preprocess'):
+        md_content = preprocess_markdown(md_content)
+    with span('markdown'):
+        html = _markdown_converter().reset().convert(md_content)
+    # The preview is shown in an iframe without access to the asset store, so images are inlined. This is done
+    # on the finished HTML, as the base64 images are far larger than the markdown and would slow every pass over it
+    with span('inline_assets'):
+        return inline_assets(html)
+
+
+def render_cell_html(cell, idx, marks_position="Beginning"):
+    """Render a single cell to HTML, reusing the cached fragment when its content is unchanged"""
+    cell_md = cell_markdown(cell, idx, marks_position)
+    key = content_hash(cell_md)
+    html = fragment_cache.get(key)
+    if html is None:
+        html = markdown_to_html(cell_md)
+        fragment_cache.put(key, html)
+    return html
+
+
+@lru_cache(maxsize=64)
+def html_stylesheet(profile):
+    """Compile the CSS used by the HTML preview for a print profile"""
+    font_style, font_size, line_spacing = profile.font_style, profile.font_size, profile.line_spacing
+    h1, h2, h3, h4 = profile.heading_scale
+    return f"""
+    body {{
+        font-family: {font_style};
+        font-size: {font_size}pt;
+        line-height: {line_spacing};
+        margin: 20px;
+    }}
+    .first-cell-no-global-font {{
+        font-family: inherit !important;
+        font-size: inherit !important;
+    }}
+    h1, h2, h3, h4, h5, h6 {{
+        font-weight: bold !important;
+        color: #000 !important;
+        margin-top: 1em;
+        margin-bottom: 0.5em;
+        text-align: center !important;
+        display: block !important;
+        width: 100% !important;
+    }}
+    h1 {{ font-size: {font_size * h1}pt !important; }}
+    h2 {{ font-size: {font_size * h2}pt !important; }}
+    h3 {{ font-size: {font_size * h3}pt !important; }}
+    h4 {{ font-size: {font_size * h4}pt !important; }}
+    img {{ max-width: 100%; height: auto; display: block; margin: 10px auto; }}
+    ul, ol {{
+        margin: 10px 0;
+        padding-left: 30px;
+    }}
+    li {{
+        margin-bottom: 8px;
+        line-height: {line_spacing};
+    }}
+    ol {{
+        list-style-type: lower-alpha;
+    }}
+    div[style*="text-align: center"] {{
+        text-align: center;
+    }}
+    center {{
+        text-align: center !important;
+        display: block !important;
+        width: 100% !important;
+    }}
+    center h1, center h2, center h3, center h4, center h5, center h6 {{
+        text-align: center !important;
+        font-weight: bold !important;
+    }}
+    div[style*="float: left"] {{
+        float: left;
+    }}
+    div[style*="float: right"] {{
+        float: right;
+    }}
+    div[style*="overflow: hidden"] {{
+        overflow: hidden;
+        clear: both;
+    }}
+    """
+
+
+def _html_document(css, html_body):
+    """Wrap an HTML body and stylesheet into a complete document"""
+    html = f"""
+    <html>
+    <head>
+    <meta charset="utf-8">
+    <style>{css}</style>
+    </head>
+    <body>{html_body}</body>
+    </html>
+    """
+    return html
+
+
+def generate_html(md_content, font_style, font_size, line_spacing, pagination, profile_name=DEFAULT_PROFILE):
+    """Generate HTML for preview"""
+    html_body = markdown_to_html(md_content)
+    with span('css'):
+        css_content = html_stylesheet(print_profile(profile_name, font_style, font_size, line_spacing))
+    return _html_document(css_content, html_body)
+
+
+def generate_preview_html(cells, font_style, font_size, line_spacing, pagination, marks_position="Beginning", profile_name=DEFAULT_PROFILE):
+    """Generate HTML for preview from per-cell fragments so only edited cells are re-rendered"""
+    html_body = "\n".join(render_cell_html(cell, idx, marks_position) for idx, cell in enumerate(cells))
+    with span('css'):
+        css_content = html_stylesheet(print_profile(profile_name, font_style, font_size, line_spacing))
+    return _html_document(css_content, html_body)
+
+
+@lru_cache(maxsize=64)
+def pdf_stylesheet(profile):
+    """Compile the CSS used for PDF output for a print profile"""
+    font_style, font_size, line_spacing = profile.font_style, profile.font_size, profile.line_spacing
+    h1, h2, h3, h4 = profile.heading_scale
+    # The page is laid out from paper_size and borders; @page only keeps stylesheets of different profiles apart
+    return f"""
+    @page {{
+        margin: {profile.margin_in}in;
+        size: {profile.paper_size};
+    }}
+    body {{
+        font-family: "{font_style}", serif;
+        font-size: {font_size}pt;
+        line-height: {line_spacing};
+        color: #000;
+        margin: 0;
+        padding: 0;
+    }}
+    .first-cell-no-global-font {{
+        font-family: inherit !important;
+        font-size: inherit !important;
+    }}
+    h1, h2, h3, h4, h5, h6 {{
+        font-weight: bold !important;
+        color: #000 !important;
+        margin-top: 1em;
+        margin-bottom: 0.5em;
+        text-align: center !important;
+        display: block !important;
+        width: 100% !important;
+    }}
+    h1 {{
+        font-size: {font_size * h1}pt !important;
+        margin-top: 1.2em;
+        margin-bottom: 0.6em;
+        text-align: center !important;
+        font-weight: bold !important;
+    }}
+    h2 {{
+        font-size: {font_size * h2}pt !important;
+        margin-top: 1em;
+        margin-bottom: 0.5em;
+        text-align: center !important;
+        font-weight: bold !important;
+    }}
+    h3 {{
+        font-size: {font_size * h3}pt !important;
+        margin-top: 0.8em;
+        margin-bottom: 0.4em;
+        text-align: center !important;
+        font-weight: bold !important;
+    }}
+    h4 {{
+        font-size: {font_size * h4}pt !important;
+        margin-top: 0.7em;
+        margin-bottom: 0.4em;
+        text-align: center !important;
+        font-weight: bold !important;
+    }}
+    h5, h6 {{
+        font-weight: bold !important;
+        text-align: center !important;
+    }}
+    ul, ol {{
+        margin: 10px 0;
+        padding-left: 30px;
+    }}
+    li {{
+        margin-bottom: 8px;
+        display: list-item;
+        line-height: {line_spacing};
+    }}
+    ol li {{
+        list-style-type: lower-alpha;
+    }}
+    ul li {{
+        list-style-type: disc;
+    }}
+    strong, b {{
+        font-weight: bold;
+    }}
+    em, i {{
+        font-style: italic;
+    }}
+    img {{
+        max-width: 100%;
+        height: auto;
+        display: block;
+        margin: 10px auto;
+    }}
+    table {{
+        width: 100%;
+        border-collapse: collapse;
+        margin: 10px 0;
+    }}
+    th, td {{
+        border: 1px solid #000;
+        padding: 8px;
+        text-align: left;
+    }}
+    th {{
+        font-weight: bold;
+        background-color: #f5f5f5;
+    }}
+    .page-break {{
+        page-break-after: always;
+    }}
+    /* MuPDF applies inline styles itself and rejects [style*=...] selectors, so those rules are HTML only */
+    center {{
+        text-align: center !important;
+        display: block !important;
+        width: 100% !important;
+    }}
+    center h1, center h2, center h3, center h4, center h5, center h6 {{
+        text-align: center !important;
+        font-weight: bold !important;
+    }}
+    """
+
+
+def render_section_pdf(section_md, profile):
+    """Render one section of the paper to PDF bytes"""
+    from markdown_pdf import MarkdownPdf, Section
+
+    # Pre-process markdown to fix list formatting and centered headers, and point images at the asset store
+    with span('preprocess'):
+        processed_md = preprocess_markdown(asset_paths(section_md))
+
+    with FITZ_LOCK:
+        # Use real font files for the paper font and any Indic scripts, setting each script's text in its own font
+        with span('fonts'):
+            processed_md, faces = prepare_fonts(processed_md, profile.font_style)
+            archive = font_archive(faces)
+        with span('css'):
+            css_content = pdf_stylesheet(profile) + font_face_css(faces)
+
+        # Create MarkdownPdf instance with proper configuration
+        pdf = MarkdownPdf(toc_level=2)
+
+        # Add the processed markdown content as a section laid out on the profile's page, styled by its stylesheet
+        with span('layout'):
+            section = Section(processed_md, toc=False, root=archive,
+                              paper_size=profile.paper_size, borders=page_borders(profile))
+            pdf.add_section(section, user_css=css_content)
+
+        with span('serialize'):
+            return pdf_document_bytes(pdf)
+
+
+def traced_section_pdf(section_md, profile):
+    """Render one section in a render worker, returning its PDF bytes and the time and memory of each stage"""
+    trace = RenderTrace('section')
+    with trace.activate():
+        pdf_bytes = render_section_pdf(section_md, profile)
+    return pdf_bytes, trace.stages, trace.memory, trace.peak, trace.attrs
+
+
+def traced_document_pdf(sections):
+    """Stitch section PDFs in a render worker, returning the PDF bytes and the time and memory of each stage
+
+    PyMuPDF must not be used from several threads at once, so the app and the render service stitch on the
+    workers rather than on the threads that collect their sections.
+    """
+    trace = RenderTrace('document')
+    with trace.activate():
+        pdf_bytes = stitch_pdfs(sections)
+    return pdf_bytes, trace.stages, trace.memory, trace.peak, trace.attrs
+
+
+def pdf_document_bytes(pdf):
+    """Serialize a MarkdownPdf into bytes in memory, without a temp file"""
+    buffer = io.BytesIO()
+    pdf.save_bytes(buffer)
+    return buffer.getvalue()
+
+
+def split_sections(md_content):
+    """Split paper markdown into sections at page breaks"""
+    return md_content.split(PAGE_BREAK)
+
+
+def section_key(section_md, profile):
+    """Return the cache key of a PDF section"""
+    return content_hash(pdf_stylesheet(profile) + '\0' + section_md)
+
+
+def cached_section_pdf(section_md, profile):
+    """Render a section to PDF, reusing the cached result when the section is unchanged"""
+    key = section_key(section_md, profile)
+    pdf_bytes = section_cache.get(key)
+    if pdf_bytes is None:
+        pdf_bytes = render_section_pdf(section_md, profile)
+        section_cache.put(key, pdf_bytes)
+    return pdf_bytes
+
+
+def stitch_pdfs(sections):
+    """Join rendered section PDFs into a single document, embedding only the glyphs the paper uses"""
+    import fitz
+
+    with FITZ_LOCK:
+        doc = fitz.open()
+        with span('stitch'):
+            for pdf_bytes in sections:
+                with fitz.open("pdf", pdf_bytes) as section_doc:
+                    if not doc.page_count:
+                        doc.set_metadata(section_doc.metadata)
+                    doc.insert_pdf(section_doc)
+        # Sections each embed whole fonts; a large Noto font is mostly glyphs the paper never uses
+        with span('subset_fonts'):
+            try:
+                doc.subset_fonts()
+            except (RuntimeError, fitz.mupdf.FzErrorBase) as e:
+                # The PDF is still correct, only larger, so it is kept with its whole fonts
+                logger.warning("Font subsetting failed; the PDF embeds whole fonts", exc_info=True)
+                note(subset_fonts_error=str(e))
+        with span('compress'):
+            pdf_bytes = doc.tobytes(garbage=3, deflate=True)
+        doc.close()
+    return pdf_bytes
+
+
+def document_key(section_keys):
+    """Return the cache key of a whole PDF made of the given sections"""
+    return content_hash("\0".join(section_keys))
+
+
+def cached_document_pdf(section_keys, sections):
+    """Stitch and subset section PDFs, reusing the result for a paper whose sections are unchanged"""
+    key = document_key(section_keys)
+    pdf_bytes = document_cache.get(key)
+    if pdf_bytes is None:
+        pdf_bytes = stitch_pdfs(sections)
+        document_cache.put(key, pdf_bytes)
+    return pdf_bytes
+
+
+def generate_pdf_from_markdown(md_content, font_style, font_size, line_spacing, pagination, profile_name=DEFAULT_PROFILE):
+    """Generate PDF from markdown, rendering each page-break section separately and stitching them"""
+    profile = print_profile(profile_name, font_style, font_size, line_spacing)
+    sections_md = split_sections(md_content)
+    sections = [cached_section_pdf(section_md, profile) for section_md in sections_md]
+    return cached_document_pdf([section_key(section_md, profile) for section_md in sections_md], sections)
+
+
+# A page with a heading, a question and options, enough to exercise every stage of a render
+WARM_UP_MD = '<div style="text-align: center;">\n# Pariksha\n</div>\n\n**[Marks: 1]** **(Q1)** Warm up:\n\na) one\nb) two\n'
+
+
+def warm_up_preview():
+    """Load the markdown library and build the preview converter, so a teacher's first preview is not the slow one"""
+    markdown_to_html(WARM_UP_MD)
+
+
+def warm_up():
+    """Load the markdown and PDF libraries, index fonts and lay out a tiny page, so a teacher's first render is not the slow one"""
+    warm_up_preview()
+    stitch_pdfs([render_section_pdf(WARM_UP_MD, print_profile())])
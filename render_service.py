@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Render service for Pariksha - Question Paper Drafting System
+Serves markdown, HTML and PDF renders of papers in the metadata/*.json format over local HTTP, for other school systems
+"""
+
+import os
+import math
+import sys
+import json
+import queue
+import argparse
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, quote, urlparse
+
+from jobs import render_jobs
+from paper import cells_from_metadata, paper_settings
+from render import content_hash, generate_html, generate_md
+from storage import atomic_write, safe_filename
+from tracing import RenderTrace
+
+# Requests accepted but not yet rendered are kept here so they survive a restart
+SERVICE_JOBS_DIR = "service_jobs"
+
+CONTENT_TYPES = {
+    'md': "text/markdown; charset=utf-8",
+    'html': "text/html; charset=utf-8",
+    'pdf': "application/pdf",
+}
+
+# Largest request body accepted; papers with inline images can be several MB
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+
+def content_disposition(name, fmt):
+    """Return the Content-Disposition header for a rendered paper, safe for any paper name
+
+    Names outside ASCII are sent as an RFC 5987 filename*, with an ASCII filename for older clients.
+    """
+    filename = f"{safe_filename(name, 'paper')}.{fmt}"
+    ascii_filename = filename.encode('ascii', 'replace').decode('ascii').replace('?', '_')
+    disposition = f'inline; filename="{ascii_filename}"'
+    if ascii_filename != filename:
+        disposition += f"; filename*=UTF-8''{quote(filename, safe='')}"
+    return disposition
+
+
+class QueueFull(Exception):
+    """Raised when a render is requested while the queue is full"""
+
+
+class ServiceJob:
+    """A render requested from the service"""
+
+    def __init__(self, job_id, fmt, name, data):
+        self.id = job_id
+        self.format = fmt
+        self.name = name
+        self.data = data
+        self.status = "queued"
+        self.error = None
+        self.result = None
+        self.finished = threading.Event()
+
+    def summary(self):
+        """Return the job's state as sent to clients"""
+        summary = {'id': self.id, 'format': self.format, 'name': self.name, 'status': self.status}
+        if self.error:
+            summary['error'] = self.error
+        if self.status == "done":
+            summary['result'] = f"/jobs/{self.id}/result"
+        return summary
+
+
+class RenderService:
+    """Queue renders of papers, render them on worker threads and keep recent results"""
+
+    def __init__(self, jobs_dir=SERVICE_JOBS_DIR, workers=2, max_queue=32, max_results=64):
+        self.jobs_dir = Path(jobs_dir)
+        self.workers = workers
+        self.max_results = max_results
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the worker threads, then queue the jobs left pending by the last run"""
+        for index in range(self.workers):
+            threading.Thread(target=self._work, name=f"pariksha-service-{index}", daemon=True).start()
+        return self._restore()
+
+    def submit(self, fmt, name, data):
+        """Queue a render and return its job, reusing a queued, running or finished job for the same request"""
+        if fmt not in CONTENT_TYPES:
+            raise ValueError(f"Unknown format '{fmt}', expected one of {', '.join(CONTENT_TYPES)}")
+        if not isinstance(data, dict) or not isinstance(data.get('cells'), list):
+            raise ValueError("Expected a paper in the metadata/*.json format, with a 'cells' list")
+        # Fail on malformed cells now rather than in the worker
+        cells_from_metadata(data)
+
+        job_id = content_hash(json.dumps([fmt, name, data], sort_keys=True, ensure_ascii=False))
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.status != "failed":
+                self._jobs.move_to_end(job_id)
+                return job
+            job = ServiceJob(job_id, fmt, name, data)
+            # Written before it is queued, so a worker that finishes it at once always finds the file to remove
+            self._persist(job)
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self._forget(job)
+                raise QueueFull(f"The render queue is full ({self._queue.maxsize} papers); try again shortly")
+            self._jobs[job_id] = job
+            self._prune()
+        return job
+
+    def get(self, job_id):
+        """Return the job with the given id, or None"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        """Return the number of jobs in each state"""
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {'queued': self._queue.qsize(), 'max_queue': self._queue.maxsize, 'workers': self.workers, 'jobs': counts}
+
+    def _job_file(self, job):
+        """Return the file a pending job is kept in"""
+        return self.jobs_dir / f"{job.id}.json"
+
+    def _persist(self, job):
+        """Write a pending job to disk so it is rendered even if the service restarts first"""
+        try:
+            atomic_write(self._job_file(job), json.dumps({'format': job.format, 'name': job.name, 'data': job.data},
+                                                         ensure_ascii=False))
+        except OSError:
+            # The job still renders; it just won't survive a restart
+            pass
+
+    def _forget(self, job):
+        """Remove a job's pending file"""
+        try:
+            os.unlink(self._job_file(job))
+        except OSError:
+            pass
+
+    def _restore(self):
+        """Queue jobs persisted by a previous run, oldest first, and return how many there were"""
+        if not self.jobs_dir.exists():
+            return 0
+        restored = 0
+        for job_file in sorted(self.jobs_dir.glob("*.json"), key=lambda path: path.stat().st_mtime):
+            try:
+                with open(job_file, 'r', encoding='utf-8') as f:
+                    pending = json.load(f)
+                job = ServiceJob(job_file.stem, pending['format'], pending['name'], pending['data'])
+            except (OSError, ValueError, KeyError):
+                continue
+            with self._lock:
+                self._jobs[job.id] = job
+            # Waits for room, as more jobs may be pending than the queue holds
+            self._queue.put(job)
+            restored += 1
+        return restored
+
+    def _work(self):
+        """Render queued jobs one at a time"""
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                job.status = "running"
+            try:
+                result, error = self._render(job), None
+            except Exception as e:
+                result, error = None, str(e)
+            self._forget(job)
+            # Set together under the lock, so a request never sees a job "done" without its result
+            with self._lock:
+                job.result, job.error = result, error
+                job.status = "failed" if error else "done"
+                self._prune()
+            job.finished.set()
+
+    def _render(self, job):
+        """Render a job with the same code as the app and return the result bytes"""
+        font_style, font_size, line_spacing, pagination, profile_name = paper_settings(job.data)
+        trace = RenderTrace(f"service_{job.format}", paper=job.name)
+        with trace.activate():
+            md_content = generate_md(cells_from_metadata(job.data), job.name, job.data.get('marks_position', 'Beginning'))
+            if job.format == 'html':
+                html_content = generate_html(md_content, font_style, font_size, line_spacing, pagination, profile_name)
+        if job.format == 'md':
+            trace.finish(md_bytes=len(md_content.encode('utf-8')))
+            return md_content.encode('utf-8')
+        if job.format == 'html':
+            trace.finish(html_bytes=len(html_content.encode('utf-8')))
+            return html_content.encode('utf-8')
+
+        # PDFs go through the app's render workers, sharing their section cache and de-duplication
+        render_job = render_jobs.submit(md_content, font_style, font_size, line_spacing, pagination, profile_name,
+                                        owner=job.id, trace=trace)
+        if render_job.wait() != "done":
+            raise RuntimeError(render_job.error or f"PDF render {render_job.status}")
+        return render_job.pdf_bytes
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond max_results"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in ("done", "failed")]
+        while len(self._jobs) > self.max_results and finished:
+            del self._jobs[finished.pop(0)]
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front end of a RenderService
+
+    POST /jobs?format=pdf&name=...   queue a render of the JSON paper in the body; 202 with the job
+    GET  /jobs/<id>                   the job's status
+    GET  /jobs/<id>/result            the rendered paper once done
+    POST /render?format=pdf&name=...  queue a render and wait for it, returning the rendered paper
+    GET  /health                      queue and job counts
+    """
+
+    service = None
+    server_version = "ParikshaRender/1.0"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = url.path.strip('/').split('/')
+        if parts == ['health']:
+            return self._send_json(200, {'status': "ok", **self.service.stats()})
+        if len(parts) in (2, 3) and parts[0] == 'jobs':
+            job = self.service.get(parts[1])
+            if job is None:
+                return self._send_json(404, {'error': "Unknown job"})
+            if len(parts) == 2:
+                return self._send_json(200, job.summary())
+            if parts[2] == 'result':
+                return self._send_result(job)
+        self._send_json(404, {'error': "Not found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path not in ('/jobs', '/render'):
+            return self._send_json(404, {'error': "Not found"})
+        query = parse_qs(url.query)
+        fmt = query.get('format', ['pdf'])[0]
+        name = query.get('name', ['Untitled'])[0]
+        try:
+            timeout = float(query.get('timeout', ['300'])[0])
+        except ValueError:
+            timeout = -1
+        if not (math.isfinite(timeout) and timeout >= 0):
+            return self._send_json(400, {'error': "Invalid timeout; give the seconds to wait for the render"})
+
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            return self._send_json(400, {'error': "Invalid Content-Length"})
+        if length > MAX_BODY_BYTES:
+            return self._send_json(413, {'error': f"Papers larger than {MAX_BODY_BYTES // 1024 // 1024} MB are not accepted"})
+        try:
+            data = json.loads(self.rfile.read(length) or b'null')
+            job = self.service.submit(fmt, name, data)
+        except QueueFull as e:
+            return self._send_json(503, {'error': str(e)}, {'Retry-After': "5"})
+        except (ValueError, KeyError, TypeError) as e:
+            message = f"Missing field {e}" if isinstance(e, KeyError) else str(e)
+            return self._send_json(400, {'error': message})
+
+        if url.path == '/jobs':
+            return self._send_json(200 if job.status == "done" else 202, job.summary())
+        if not job.finished.wait(timeout):
+            return self._send_json(504, {**job.summary(), 'error': "Timed out waiting for the render; poll the job instead"})
+        self._send_result(job)
+
+    def _send_result(self, job):
+        """Send a job's rendered paper, or its status if it has none"""
+        if job.status == "done":
+            self._send(200, job.result, CONTENT_TYPES[job.format], {
+                'Content-Disposition': content_disposition(job.name, job.format),
+                'ETag': f'"{job.id}"',
+            })
+        elif job.status == "failed":
+            self._send_json(500, job.summary())
+        else:
+            self._send_json(202, job.summary())
+
+    def _send_json(self, status, body, headers=None):
+        """Send a JSON response"""
+        self._send(status, json.dumps(body, ensure_ascii=False).encode('utf-8'), "application/json; charset=utf-8", headers)
+
+    def _send(self, status, body, content_type, headers=None):
+        """Send a response with a body"""
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for header, value in (headers or {}).items():
+            self.send_header(header, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    """Main function for command line usage"""
+    parser = argparse.ArgumentParser(description="Pariksha Render Service")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: this computer only)")
+    parser.add_argument("--port", "-p", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--workers", "-w", type=int, default=2, help="Number of papers rendered at the same time")
+    parser.add_argument("--render-workers", type=int, help="Number of PDF render processes (default: PARIKSHA_RENDER_WORKERS or up to 4)")
+    parser.add_argument("--queue-size", "-q", type=int, default=32, help="Most papers waiting to be rendered before new ones are refused")
+    parser.add_argument("--jobs-dir", default=SERVICE_JOBS_DIR, help="Directory where pending jobs are kept across restarts")
+
+    args = parser.parse_args()
+
+    if args.render_workers:
+        render_jobs.max_workers = args.render_workers
+    service = RenderService(args.jobs_dir, args.workers, args.queue_size)
+    restored = service.start()
+    if restored:
+        print(f"♻️ Resumed {restored} pending render(s)")
+
+    RenderRequestHandler.service = service
+    server = ThreadingHTTPServer((args.host, args.port), RenderRequestHandler)
+    print(f"🚀 Render service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Render service stopped")
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Paper storage for Pariksha - Question Paper Drafting System
+Atomic, locked saves of papers/<name>.md and metadata/<name>.json with an append-only journal of cell edits
+"""
+
+import os
+import re
+import json
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+
+JOURNAL_SUFFIX = ".journal"
+
+# Fold the journal back into the JSON after this many saves, or once it is half the size of the JSON
+COMPACT_RECORDS = 50
+COMPACT_RATIO = 0.5
+
+# Characters that cannot appear in file names on Windows, and control characters such as CR and LF
+UNSAFE_FILENAME_PATTERN = re.compile(r'[\\/:*?"<>|\x00-\x1f\x7f]+')
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+class SaveConflict(Exception):
+    """Raised when a paper changed on disk since the version the caller started from"""
+
+
+def safe_filename(name, default):
+    """Return name as a file name that is valid on any system, or default if nothing of it is left"""
+    return UNSAFE_FILENAME_PATTERN.sub("_", str(name)).strip() or default
+
+
+def atomic_write(path, data):
+    """Write text or bytes to path via a temp file and rename, so readers never see a partial file"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def paper_lock(name):
+    """Return the lock serializing saves of one paper"""
+    with _locks_guard:
+        return _locks.setdefault(name, threading.Lock())
+
+
+def paper_version(metadata):
+    """Return a hash identifying the content of a paper's metadata"""
+    return hashlib.sha1(json.dumps(metadata, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def journal_path(metadata_path):
+    """Return the journal file that belongs to a metadata file"""
+    return Path(metadata_path).with_suffix(JOURNAL_SUFFIX)
+
+
+def _read_journal(metadata_path):
+    """Return the complete records in a paper's journal, ignoring a torn last line"""
+    path = journal_path(metadata_path)
+    if not path.exists():
+        return []
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def _apply_journal(data, records):
+    """Replay journal records of replaced cells onto a metadata dictionary"""
+    for record in records:
+        for index, cell in record['cells'].items():
+            index = int(index)
+            if index < len(data['cells']):
+                data['cells'][index] = cell
+    return data
+
+
+def read_metadata(metadata_path):
+    """Read a paper's metadata JSON with its journal applied"""
+    with open(metadata_path, 'r') as f:
+        data = json.load(f)
+    return _apply_journal(data, _read_journal(metadata_path))
+
+
+def metadata_stat(metadata_path):
+    """Return the modified time and size of a paper's metadata including its journal"""
+    stat = os.stat(metadata_path)
+    modified, size = stat.st_mtime, stat.st_size
+    path = journal_path(metadata_path)
+    if path.exists():
+        journal_stat = path.stat()
+        modified, size = max(modified, journal_stat.st_mtime), size + journal_stat.st_size
+    return modified, size
+
+
+def _append_journal(metadata_path, record):
+    """Append one record to a paper's journal and make sure it reaches the disk"""
+    path = journal_path(metadata_path)
+    line = json.dumps(record, default=str) + "\n"
+    with open(path, 'a+b') as f:
+        # Start on a fresh line if a crash left a torn record at the end
+        if f.seek(0, os.SEEK_END):
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                line = "\n" + line
+        f.write(line.encode('utf-8'))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _compact(metadata_path, data):
+    """Write the merged metadata atomically and drop the journal"""
+    atomic_write(metadata_path, json.dumps(data, default=str))
+    path = journal_path(metadata_path)
+    if path.exists():
+        path.unlink()
+
+
+def _write_if_changed(path, text):
+    """Atomically write text to path unless the file already holds it"""
+    path = Path(path)
+    if path.exists() and path.read_text(encoding='utf-8') == text:
+        return False
+    atomic_write(path, text)
+    return True
+
+
+def save_paper(name, metadata, md_content, papers_dir="papers", metadata_dir="metadata", expected_version=None):
+    """Save a paper's markdown and metadata, returning "unchanged", "journaled" or "written" and the new version"""
+    metadata_path = Path(metadata_dir) / f"{name}.json"
+    with paper_lock(name):
+        current = read_metadata(metadata_path) if metadata_path.exists() else None
+        # expected_version is the version the caller loaded or last saved; anything else means another save got in first
+        if current is not None and expected_version is not None and paper_version(current) != expected_version:
+            raise SaveConflict(f"{name} was changed by someone else since it was loaded")
+
+        md_written = _write_if_changed(Path(papers_dir) / f"{name}.md", md_content)
+        version = paper_version(metadata)
+        if current is not None and paper_version(current) == version:
+            return ("written" if md_written else "unchanged"), version
+
+        settings_changed = current is None or any(current.get(key) != value for key, value in metadata.items() if key != 'cells')
+        if settings_changed or len(current['cells']) != len(metadata['cells']):
+            _compact(metadata_path, metadata)
+            return "written", version
+
+        changed = {str(index): cell for index, cell in enumerate(metadata['cells']) if current['cells'][index] != cell}
+        _append_journal(metadata_path, {'cells': changed})
+
+        records = len(_read_journal(metadata_path))
+        if records >= COMPACT_RECORDS or journal_path(metadata_path).stat().st_size > COMPACT_RATIO * metadata_path.stat().st_size:
+            _compact(metadata_path, metadata)
+            return "written", version
+        return "journaled", version
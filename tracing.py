@@ -0,0 +1,156 @@
+"""
+Render tracing for Pariksha - Question Paper Drafting System
+Times each stage of building a paper's markdown, HTML and PDF and logs one structured line per render.
+With a memory ceiling set, also measures the memory each stage allocates and stops renders that exceed it.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+logger = logging.getLogger("pariksha.render")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(os.environ.get("PARIKSHA_LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
+
+# Most memory one render may allocate, in MB; 0 means no limit
+MEMORY_LIMIT_MB = float(os.environ.get("PARIKSHA_RENDER_MEMORY_MB", 0))
+
+# Measure memory per stage even without a limit; tracemalloc slows rendering, so it is off by default
+TRACE_MEMORY = os.environ.get("PARIKSHA_TRACE_MEMORY", "") not in ("", "0")
+
+_local = threading.local()
+
+
+class RenderMemoryError(Exception):
+    """Raised when a render allocates more memory than its limit"""
+
+
+class RenderTrace:
+    """Time spent in each stage of one render, with facts about what was rendered"""
+
+    def __init__(self, kind, memory_limit_mb=None, **attrs):
+        self.kind = kind
+        self.attrs = attrs
+        self.stages = {}
+        self.memory = {}
+        self.memory_limit = (MEMORY_LIMIT_MB if memory_limit_mb is None else memory_limit_mb) * 1024 * 1024
+        self.track_memory = TRACE_MEMORY or self.memory_limit > 0
+        self.held = 0
+        self.peak = 0
+        self.started = time.perf_counter()
+        self.elapsed = None
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        """Add time to a stage; stages run more than once, or in parallel workers, are summed"""
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add_memory(self, stage, allocated, retained):
+        """Record the most a stage allocated at once and what it still held at its end, in bytes
+
+        The render's peak is what earlier stages still hold plus the most the current stage allocates.
+        """
+        with self._lock:
+            self.memory[stage] = max(self.memory.get(stage, 0), allocated)
+            self.peak = max(self.peak, self.held + allocated)
+            self.held += retained
+
+    def merge(self, stages, memory=None, peak=0, attrs=None):
+        """Add the stage times, memory and facts recorded by another trace, e.g. one returned from a worker process"""
+        for stage, seconds in stages.items():
+            self.add(stage, seconds)
+        with self._lock:
+            self.attrs.update(attrs or {})
+            for stage, allocated in (memory or {}).items():
+                self.memory[stage] = max(self.memory.get(stage, 0), allocated)
+            self.peak = max(self.peak, peak)
+
+    def check_memory(self, stage):
+        """Fail the render if it has allocated more than its limit"""
+        if self.memory_limit and self.peak > self.memory_limit:
+            raise RenderMemoryError(
+                f"Rendering needed more than the {self.memory_limit / 1024 / 1024:.0f} MB allowed per render "
+                f"({stage} reached {self.peak / 1024 / 1024:.0f} MB). "
+                f"Use smaller images or split the paper with page breaks."
+            )
+
+    @contextmanager
+    def activate(self):
+        """Record spans on this thread into this trace"""
+        previous = getattr(_local, 'trace', None)
+        _local.trace = self
+        try:
+            yield self
+        finally:
+            _local.trace = previous
+
+    def finish(self, **attrs):
+        """Stop the clock, add final facts and write the trace to the log"""
+        self.attrs.update(attrs)
+        self.elapsed = time.perf_counter() - self.started
+        logger.info(json.dumps(self.record(), default=str, ensure_ascii=False))
+
+    def record(self):
+        """Return the trace as a dictionary of milliseconds and attributes"""
+        elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self.started
+        with self._lock:
+            stages = {stage: round(seconds * 1000, 1) for stage, seconds in self.stages.items()}
+            memory = {stage: round(allocated / 1024) for stage, allocated in self.memory.items()}
+            peak = self.peak
+        record = {'kind': self.kind, **self.attrs, 'elapsed_ms': round(elapsed * 1000, 1), 'stages_ms': stages}
+        if memory:
+            record['peak_kb'] = round(peak / 1024)
+            record['top_memory_stage'] = max(memory, key=memory.get)
+            record['memory_kb'] = memory
+        return record
+
+
+@contextmanager
+def span(stage):
+    """Time a block as a stage of the trace active on this thread, if any, and check its memory
+
+    tracemalloc counts allocations of the whole process, so renders running at the same time on other
+    threads of the app add to each other's figures; each render worker process only ever runs one.
+    """
+    trace = getattr(_local, 'trace', None)
+    if trace is None:
+        yield
+        return
+    if trace.track_memory:
+        # Started at the first stage rather than on import, so module imports are neither slowed down nor counted,
+        # and left running as renders on other threads may be measuring too
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(stage, time.perf_counter() - start)
+        if trace.track_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            trace.add_memory(stage, peak - before, current - before)
+    if trace.track_memory:
+        trace.check_memory(stage)
+
+
+def note(**attrs):
+    """Add facts to the trace active on this thread, if any, e.g. a stage that fell back to a slower path"""
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        trace.attrs.update(attrs)
+
+
+def content_stats(md_content):
+    """Return the size in bytes and number of images of paper markdown"""
+    return {'md_bytes': len(md_content.encode('utf-8')), 'images': md_content.count('![')}
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Paper sets for Pariksha - Question Paper Drafting System
+Builds shuffled sets (A, B, C, ...) of a saved paper to deter copying, renders them together and writes an answer key
+"""
+
+import re
+import sys
+import json
+import random
+import string
+import time
+import argparse
+from pathlib import Path
+
+from assets import asset_paths
+from catalog import CATALOG_PATH, PaperCatalog
+from jobs import render_jobs
+from paper import Cell, cells_from_metadata, load_metadata, paper_metadata, paper_settings
+from preprocess import OPTION_PATTERN
+from render import generate_md
+from storage import atomic_write, save_paper
+from tracing import RenderTrace
+
+# Options such as "None of the above" only make sense in their place, so they are never moved
+PINNED_OPTION_PATTERN = re.compile(r'\bof the (?:above|these)\b', re.IGNORECASE)
+
+# Options that point at other options by letter, e.g. "Both (a) and (b)"; their block is left in order
+OPTION_REFERENCE_PATTERN = re.compile(r'\(?\b[a-d]\)')
+
+
+def is_question(cell):
+    """Return whether a cell is a numbered question that may change places with its neighbours"""
+    return cell.type == 'textbox' and cell.question_num > 0 and not cell.center
+
+
+def question_runs(cells):
+    """Return each run of questions between page breaks and centered headers, as blocks of cell indexes
+
+    A block is a question and the unnumbered cells after it, such as a data table or figure, which move with it.
+    Unnumbered cells before the first question of a run, such as instructions, stay where they are.
+    """
+    runs = [[]]
+    for idx, cell in enumerate(cells):
+        if is_question(cell):
+            runs[-1].append([idx])
+        elif cell.type == 'textbox' and not cell.center:
+            if runs[-1]:
+                runs[-1][-1].append(idx)
+        elif runs[-1]:
+            runs.append([])
+    return [run for run in runs if len(run) > 1]
+
+
+def option_blocks(lines):
+    """Return the line indexes of each block of consecutive a)-d) options"""
+    blocks = [[]]
+    for idx, line in enumerate(lines):
+        stripped = line.strip()
+        if stripped[1:2] == ')' and OPTION_PATTERN.match(stripped):
+            blocks[-1].append(idx)
+        elif blocks[-1]:
+            blocks.append([])
+    return [block for block in blocks if len(block) > 1]
+
+
+def shuffle_options(text, rng):
+    """Shuffle the option blocks of a question, relabelling the options in order
+
+    Returns the new text and, for each block, the original letter of the option now under each letter.
+    """
+    lines = text.split('\n')
+    mappings = []
+    for block in option_blocks(lines):
+        options = [OPTION_PATTERN.match(lines[idx].strip()).groups() for idx in block]
+        if any(OPTION_REFERENCE_PATTERN.search(option) for _, option in options):
+            continue
+        movable = [pos for pos, (_, option) in enumerate(options) if not PINNED_OPTION_PATTERN.search(option)]
+        order = list(range(len(options)))
+        shuffled = movable[:]
+        rng.shuffle(shuffled)
+        for pos, source in zip(movable, shuffled):
+            order[pos] = source
+        mapping = {}
+        for pos, idx in enumerate(block):
+            letter = options[pos][0]
+            original_letter, option = options[order[pos]]
+            indent = lines[idx][:len(lines[idx]) - len(lines[idx].lstrip())]
+            lines[idx] = f"{indent}{letter}) {option}"
+            mapping[letter] = original_letter
+        mappings.append(mapping)
+    return '\n'.join(lines), mappings
+
+
+def copy_cell(cell, **changes):
+    """Return a copy of a cell with some fields changed"""
+    fields = {
+        'cell_type': cell.type, 'code': cell.code, 'question_num': cell.question_num, 'marks': cell.marks,
+        'center': cell.center, 'table_rows': cell.table_rows, 'table_cols': cell.table_cols,
+    }
+    fields.update(changes)
+    return Cell(**fields)
+
+
+def make_variant(cells, label, seed, add_label=True):
+    """Build one set of a paper: questions shuffled within each run with the cells that belong to them, options shuffled
+
+    The same seed and label always give the same set. Returns the set's cells and its answer key, which gives the
+    original number of each question of the set and the original letter of each of its options.
+    """
+    rng = random.Random(f"{seed}:{label}")
+    sources = list(range(len(cells)))
+    # Questions keep the numbers of the places they move to, so the set still reads Q1, Q2, ...
+    numbers = {}
+    for run in question_runs(cells):
+        order = run[:]
+        rng.shuffle(order)
+        start = run[0][0]
+        moved = [idx for block in order for idx in block]
+        sources[start:start + len(moved)] = moved
+        for place, block in zip(run, order):
+            numbers[block[0]] = cells[place[0]].question_num
+
+    variant = []
+    key = []
+    for source in sources:
+        cell = copy_cell(cells[source], question_num=numbers.get(source, cells[source].question_num))
+        if is_question(cell):
+            cell.code, options = shuffle_options(cell.code, rng)
+            entry = {'question': cell.question_num, 'original': cells[source].question_num}
+            if options:
+                entry['options'] = options
+            key.append(entry)
+        variant.append(cell)
+
+    if add_label:
+        # Under the paper's heading, so invigilators can tell the sets apart
+        position = 1 if cells and not is_question(cells[0]) and cells[0].type == 'textbox' else 0
+        variant.insert(position, Cell(code=f"**SET {label}**", question_num=0, center=True))
+    return variant, key
+
+
+def save_set(set_name, cells, settings, marks_position, metadata_dir="metadata", papers_dir="papers", catalog=None):
+    """Save a set as a paper, as the app's Save button does, so it can be opened and touched up in the editor
+
+    Going through save_paper takes the paper's lock and writes against its journal, so edits made in the app to
+    an earlier set of the same name are replaced rather than replayed onto the new one.
+    """
+    metadata = paper_metadata(cells, *settings[:4], marks_position, settings[4])
+    md_content = generate_md(cells, set_name, marks_position)
+    save_paper(set_name, metadata, asset_paths(md_content, "../assets/"), papers_dir, metadata_dir)
+    (catalog or PaperCatalog(metadata_dir=metadata_dir)).update(set_name, metadata)
+
+
+def render_variants(name, data, labels, seed, output_dir="pdfs", add_label=True, metadata_dir=None,
+                    papers_dir="papers", catalog=None):
+    """Render a set of the paper for each label at the same time, write the PDFs and return (label, path, seconds)
+
+    All sets go to the render workers together: sections the sets have in common, such as a cover page or
+    instructions, are rendered once and shared through the section cache, and the rest run side by side.
+    """
+    cells = cells_from_metadata(data)
+    settings = paper_settings(data)
+    marks_position = data.get('marks_position', 'Beginning')
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+
+    submitted = []
+    keys = {}
+    for label in labels:
+        variant, keys[label] = make_variant(cells, label, seed, add_label)
+        set_name = f"{name} - Set {label}"
+        if metadata_dir:
+            save_set(set_name, variant, settings, marks_position, metadata_dir, papers_dir, catalog)
+        md_content = generate_md(variant, name, marks_position)
+        trace = RenderTrace("variant_pdf", paper=name, set=label)
+        submitted.append((label, set_name, time.perf_counter(), render_jobs.submit(md_content, *settings, owner=set_name, trace=trace)))
+
+    results = []
+    for label, set_name, start, job in submitted:
+        if job.wait() != "done":
+            raise RuntimeError(f"Set {label}: {job.error or f'PDF render {job.status}'}")
+        output_file = Path(output_dir) / f"{set_name}.pdf"
+        atomic_write(output_file, job.pdf_bytes)
+        results.append((label, output_file, time.perf_counter() - start))
+
+    key_file = Path(output_dir) / f"{name} - answer key.json"
+    atomic_write(key_file, json.dumps({'paper': name, 'seed': seed, 'sets': keys}, indent=4, ensure_ascii=False))
+    return results, key_file
+
+
+def main():
+    """Main function for command line usage"""
+    parser = argparse.ArgumentParser(description="Pariksha Paper Sets")
+    parser.add_argument("paper", help="Name of the saved paper to build sets of")
+    parser.add_argument("--sets", "-n", type=int, default=4, help="Number of sets, labelled A, B, C, ...")
+    parser.add_argument("--seed", "-s", help="Seed for the shuffle; the same seed gives the same sets (default: random, printed)")
+    parser.add_argument("--metadata-dir", "-m", default="metadata", help="Directory of saved paper metadata")
+    parser.add_argument("--output-dir", "-o", default="pdfs", help="Directory for the PDFs and answer key")
+    parser.add_argument("--save", action="store_true", help="Also save each set as a paper to edit in the app")
+    parser.add_argument("--papers-dir", default="papers", help="Directory for the markdown of saved sets")
+    parser.add_argument("--catalog", default=CATALOG_PATH, help="Catalog database that saved sets are added to")
+    parser.add_argument("--no-label", action="store_true", help="Do not print the set's label under the heading")
+
+    args = parser.parse_args()
+
+    if not 1 <= args.sets <= len(string.ascii_uppercase):
+        parser.error(f"--sets must be between 1 and {len(string.ascii_uppercase)}")
+    metadata_path = Path(args.metadata_dir) / f"{args.paper}.json"
+    try:
+        data = load_metadata(metadata_path)
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not read {metadata_path}: {e}")
+        return 1
+
+    seed = args.seed if args.seed is not None else str(random.SystemRandom().randrange(1_000_000))
+    labels = string.ascii_uppercase[:args.sets]
+    catalog = PaperCatalog(args.catalog, args.metadata_dir) if args.save else None
+    start = time.perf_counter()
+    try:
+        results, key_file = render_variants(args.paper, data, labels, seed, args.output_dir, not args.no_label,
+                                            args.metadata_dir if args.save else None, args.papers_dir, catalog)
+    except (RuntimeError, OSError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    for label, output_file, seconds in results:
+        print(f"✅ Set {label}: {output_file} ({seconds:.2f}s)")
+    print(f"🔑 Answer key: {key_file}")
+    print(f"Built {len(results)} sets in {time.perf_counter() - start:.2f}s with seed {seed} (--seed {seed} rebuilds them)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
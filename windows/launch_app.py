@@ -6,11 +6,15 @@ This script automatically opens the web browser and starts the Streamlit app
 
 import os
 import sys
+import multiprocessing
 import subprocess
 import webbrowser
 import time
 import socket
-from threading import Timer
+import urllib.request
+
+# How long to wait for Streamlit to answer before giving up on opening the browser
+STARTUP_TIMEOUT = 120
 
 def find_free_port():
     """Find a free port to run the application"""
@@ -20,10 +24,20 @@ def find_free_port():
         port = s.getsockname()[1]
     return port
 
-def open_browser(url):
-    """Open the web browser after a delay"""
-    time.sleep(3)  # Wait 3 seconds for the server to start
-    webbrowser.open(url)
+def wait_until_ready(url, process, timeout=STARTUP_TIMEOUT):
+    """Poll Streamlit's health check until the server answers; False if it exits or times out first"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(f"{url}/_stcore/health", timeout=1) as response:
+                if response.status == 200:
+                    return True
+        except OSError:
+            pass
+        time.sleep(0.1)
+    return False
 
 def main():
     """Main launcher function"""
@@ -47,10 +61,6 @@ def main():
     print("3. To stop the application, close this window or press Ctrl+C")
     print("="*50 + "\n")
 
-    # Schedule browser opening
-    timer = Timer(3.0, open_browser, [url])
-    timer.start()
-
     try:
         # Start the Streamlit app
         cmd = [
@@ -65,8 +75,22 @@ def main():
         # Change to app directory
         os.chdir(app_dir)
 
-        # Run the application
-        subprocess.run(cmd, check=True)
+        # Run the application, asking it to load the PDF engine in the background as soon as it starts
+        process = subprocess.Popen(cmd, env={**os.environ, 'PARIKSHA_WARMUP': '1'})
+        try:
+            # Open the browser the moment the server answers
+            if wait_until_ready(url, process):
+                print("✅ Application is ready")
+                webbrowser.open(url)
+            elif process.poll() is None:
+                print(f"⚠️ The application is taking a long time to start; open {url} once it is ready")
+            process.wait()
+        except KeyboardInterrupt:
+            process.terminate()
+            process.wait()
+            raise
+        if process.returncode:
+            raise subprocess.CalledProcessError(process.returncode, cmd)
 
     except KeyboardInterrupt:
         print("\n👋 Application stopped by user")
@@ -79,4 +103,7 @@ def main():
         input("Press Enter to exit...")
 
 if __name__ == "__main__":
+    # In the frozen Windows build, PDF render workers are started by running this executable again;
+    # freeze_support runs the worker there instead of another copy of the launcher
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file